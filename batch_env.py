@@ -0,0 +1,187 @@
+# this class runs many snake games at once as numpy arrays
+# it follows the same rules as SnakeGameAgent.make_a_step but every
+# game lives in a row of a set of integer arrays so one call to step()
+# advances all of them together
+import numpy as np
+from game_agent import BLOCK
+
+# directions in clockwise order so turning is just +1 / -1
+# 0 = RIGHT, 1 = DOWN, 2 = LEFT, 3 = UP
+RIGHT, DOWN, LEFT, UP = 0, 1, 2, 3
+DX = np.array([1, 0, -1, 0])
+DY = np.array([0, 1, 0, -1])
+
+# rewards, same as make_a_step
+REWARD_STEP = -1
+REWARD_FOOD = 30
+REWARD_DEATH = -10
+
+class BatchSnakeEnv:
+    def __init__(self, n, h=480, w=640, seed=None):
+        self.n = n
+        self.h = h
+        self.w = w
+        # board size in cells instead of pixels
+        self.rows = h // BLOCK
+        self.cols = w // BLOCK
+        self.rng = np.random.default_rng(seed)
+
+        # a snake can never be longer than the board, so the ring buffer
+        # holding the body never needs to grow
+        self.capacity = self.rows * self.cols + 1
+
+        self.head = np.zeros((n, 2), dtype=np.int32) # (x, y) in cells
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.body = np.zeros((n, self.capacity, 2), dtype=np.int32)
+        self.head_idx = np.zeros(n, dtype=np.int64) # slot of the head in body
+        self.length = np.zeros(n, dtype=np.int64)
+        self.grid = np.zeros((n, self.rows, self.cols), dtype=np.uint8) # 1 where the snake is
+        self.food = np.zeros((n, 2), dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.nframes = np.zeros(n, dtype=np.int64)
+
+        self.rows_idx = np.arange(n)
+        self.states = None
+        self.reset()
+
+    # reset every game, returns the (n, 11) states
+    def reset(self):
+        self.reset_games(self.rows_idx)
+        return self.states
+
+    # reset only the games in idx
+    def reset_games(self, idx):
+        if len(idx) == 0:
+            return
+        cx, cy = self.cols // 2, self.rows // 2
+        self.grid[idx] = 0
+        self.direction[idx] = RIGHT
+        self.head[idx] = (cx, cy)
+        # head, then two segments to the left of it
+        # body slots 0, 1, 2 hold tail, middle, head
+        for k in range(3):
+            self.body[idx, k, 0] = cx - (2 - k)
+            self.body[idx, k, 1] = cy
+            self.grid[idx, cy, cx - k] = 1
+        self.head_idx[idx] = 2
+        self.length[idx] = 3
+        self.score[idx] = 0
+        self.nframes[idx] = 0
+        self.place_food(idx)
+        self.states = self.get_states()
+
+    # put food on a random free cell for each game in idx
+    def place_food(self, idx):
+        if len(idx) == 0:
+            return
+        # random key for every cell, occupied cells can never win the argmax
+        keys = self.rng.random((len(idx), self.rows * self.cols))
+        keys[self.grid[idx].reshape(len(idx), -1) == 1] = -1.0
+        cell = np.argmax(keys, axis=1)
+        self.food[idx, 0] = cell % self.cols
+        self.food[idx, 1] = cell // self.cols
+
+    # danger check for the cell next to the head in direction d
+    def danger(self, d):
+        x = self.head[:, 0] + DX[d]
+        y = self.head[:, 1] + DY[d]
+        outside = (x < 0) | (x >= self.cols) | (y < 0) | (y >= self.rows)
+        # clip so that outside cells can still be used as an index
+        xc = np.clip(x, 0, self.cols - 1)
+        yc = np.clip(y, 0, self.rows - 1)
+        return outside | (self.grid[self.rows_idx, yc, xc] == 1)
+
+    # same 11 features as Agent.get_game_state, one row per game
+    def get_states(self):
+        d = self.direction.astype(np.int64)
+        hx, hy = self.head[:, 0], self.head[:, 1]
+        fx, fy = self.food[:, 0], self.food[:, 1]
+        state = np.stack([
+            # danger straight, right, left
+            self.danger(d),
+            self.danger((d + 1) % 4),
+            self.danger((d - 1) % 4),
+
+            # snake direction
+            d == LEFT,
+            d == RIGHT,
+            d == DOWN,
+            d == UP,
+
+            # food placement
+            hx > fx,
+            hx < fx,
+            hy > fy,
+            hy < fy,
+        ], axis=1)
+        return state.astype(int)
+
+    # actions are indices into [straight, left, right] or one-hot rows like POSSIBLE
+    # returns next_states, rewards, dones, scores
+    # next_states holds the final state for games that just ended, those games are
+    # then reset and their fresh state is in self.states for the next move
+    def step(self, actions):
+        actions = np.asarray(actions)
+        if actions.ndim == 2:
+            actions = np.argmax(actions, axis=1)
+
+        # straight keeps the direction, left turns counter clockwise, right turns clockwise
+        turn = np.array([0, -1, 1])[actions]
+        self.direction = ((self.direction + turn) % 4).astype(np.int8)
+        self.nframes += 1
+
+        # move every head one cell
+        d = self.direction.astype(np.int64)
+        new_x = self.head[:, 0] + DX[d]
+        new_y = self.head[:, 1] + DY[d]
+        self.head[:, 0] = new_x
+        self.head[:, 1] = new_y
+
+        # the tail is still on the grid here, same as make_a_step where
+        # collision is checked before the tail is popped
+        outside = (new_x < 0) | (new_x >= self.cols) | (new_y < 0) | (new_y >= self.rows)
+        xc = np.clip(new_x, 0, self.cols - 1)
+        yc = np.clip(new_y, 0, self.rows - 1)
+        hit = outside | (self.grid[self.rows_idx, yc, xc] == 1)
+        # len(snake_body) includes the new head at this point
+        timeout = self.nframes > 100 * (self.length + 1)
+        dones = hit | timeout
+
+        rewards = np.full(self.n, REWARD_STEP, dtype=np.int64)
+        rewards[dones] = REWARD_DEATH
+
+        alive = np.flatnonzero(~dones)
+        ate = alive[(new_x[alive] == self.food[alive, 0]) & (new_y[alive] == self.food[alive, 1])]
+        moved = alive[(new_x[alive] != self.food[alive, 0]) | (new_y[alive] != self.food[alive, 1])]
+        rewards[ate] = REWARD_FOOD
+        self.score[ate] += 1
+
+        # pop the tail of games that did not eat
+        tail_idx = (self.head_idx[moved] - self.length[moved] + 1) % self.capacity
+        tail = self.body[moved, tail_idx]
+        self.grid[moved, tail[:, 1], tail[:, 0]] = 0
+
+        # push the new head of every game still alive
+        self.head_idx[alive] = (self.head_idx[alive] + 1) % self.capacity
+        self.body[alive, self.head_idx[alive]] = self.head[alive]
+        self.grid[alive, new_y[alive], new_x[alive]] = 1
+        self.length[ate] += 1
+
+        # a snake that fills the whole board has nowhere left for food
+        full = ate[self.length[ate] >= self.rows * self.cols]
+        if len(full) > 0:
+            dones[full] = True
+            ate = ate[self.length[ate] < self.rows * self.cols]
+        self.place_food(ate)
+
+        next_states = self.get_states()
+        scores = self.score.copy()
+
+        # auto reset the games that are over
+        finished = np.flatnonzero(dones)
+        if len(finished) > 0:
+            self.reset_games(finished)
+        else:
+            self.states = next_states
+
+        return next_states, rewards, dones, scores
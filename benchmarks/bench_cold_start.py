@@ -0,0 +1,43 @@
+# how long a fresh process takes to get ready, the cost every worker pays
+# each case runs in a new interpreter a few times and the median is reported,
+# along with whether the process ended up importing pygame or torch
+# run from the repo root: python benchmarks/bench_cold_start.py
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "python": "pass",
+    "headless game": "from game_agent import SnakeGameAgent; SnakeGameAgent(render_mode='none')",
+    "batch env": "from batch_env import BatchSnakeEnv; BatchSnakeEnv(64)",
+    "eval worker": "import evaluate",
+    "cli --help": "import cli; cli.build_parser().format_help()",
+    "agent (torch)": "from snake_agent import Agent; Agent()",
+}
+
+# printed by every case so the parent can see what got imported
+REPORT = "import sys, json; print(json.dumps(['pygame' in sys.modules, 'torch' in sys.modules]))"
+
+def cold_start(code, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", f"{code}\n{REPORT}"], cwd=ROOT,
+                             check=True, capture_output=True, text=True).stdout
+        times.append(time.perf_counter() - start)
+    pygame, torch = json.loads(out.strip().splitlines()[-1])
+    return statistics.median(times), pygame, torch
+
+def main(repeats=5):
+    print(f"{'case':<16} {'median ms':>10} {'pygame':>7} {'torch':>6}")
+    for name, code in CASES.items():
+        seconds, pygame, torch = cold_start(code, repeats)
+        print(f"{name:<16} {seconds * 1e3:>10.0f} {str(pygame):>7} {str(torch):>6}")
+
+if __name__ == "__main__":
+    main()
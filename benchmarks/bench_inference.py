@@ -0,0 +1,43 @@
+# policy inference latency against batch size
+# compares Agent.get_moves on a whole batch with calling the network
+# once per state the way get_move does
+# run from the repo root: python benchmarks/bench_inference.py
+import os
+import sys
+import time
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from snake_agent import Agent
+from batch_env import BatchSnakeEnv
+
+BATCH_SIZES = [1, 16, 256, 4096]
+
+def main():
+    torch.manual_seed(0)
+    agent = Agent(seed=0)
+    agent.n_games = 1000 # no exploration, every row goes through the network
+    print(f"{'batch':>6} {'batched ms':>11} {'us/state':>9} {'per-state ms':>13} {'speed-up':>9}")
+    for n in BATCH_SIZES:
+        states = BatchSnakeEnv(n, seed=0).states
+        repeats = max(5, 5000 // n)
+
+        agent.get_moves(states)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            agent.get_moves(states)
+        batched = (time.perf_counter() - start) / repeats
+
+        # per-state path, capped so the big batches do not take forever
+        rows = states[:256]
+        start = time.perf_counter()
+        for state in rows:
+            with torch.inference_mode():
+                torch.argmax(agent.model(torch.tensor(state, dtype=torch.float))).item()
+        per_state = (time.perf_counter() - start) / len(rows) * n
+
+        print(f"{n:>6} {batched * 1e3:>11.3f} {batched / n * 1e6:>9.2f} "
+              f"{per_state * 1e3:>13.3f} {per_state / batched:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# latency of the numpy policy against the torch QNet forward pass
+# run from the repo root: python benchmarks/bench_numpy_policy.py
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model import QNet
+
+BATCH_SIZES = [1, 4, 16, 64, 256, 1024, 4096]
+
+def time_it(fn, repeats):
+    fn() # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+def main():
+    torch.manual_seed(0)
+    model = QNet(11, 256, 3)
+    policy = model.to_numpy()
+    rng = np.random.default_rng(0)
+
+    print(f"{'batch':>6} {'torch us':>10} {'numpy us':>10} {'speed-up':>9} {'same argmax':>12}")
+    for n in BATCH_SIZES:
+        states = rng.integers(0, 2, size=(n, 11))
+        # a single state goes in the way get_move sends it, as an (11,) vector
+        x = states[0] if n == 1 else states
+        repeats = max(20, 20000 // n)
+
+        def torch_forward():
+            with torch.inference_mode():
+                return torch.argmax(model(torch.tensor(x, dtype=torch.float)), dim=-1)
+        torch_time = time_it(torch_forward, repeats)
+        numpy_time = time_it(lambda: policy.act(x), repeats)
+        same = np.array_equal(torch_forward().numpy(), policy.act(x))
+        print(f"{n:>6} {torch_time * 1e6:>10.1f} {numpy_time * 1e6:>10.1f} "
+              f"{torch_time / numpy_time:>8.1f}x {str(same):>12}")
+
+    # cost of resyncing after an update
+    refresh_time = time_it(lambda: policy.refresh(model), 1000)
+    print(f"refresh: {refresh_time * 1e6:.1f} us")
+
+if __name__ == "__main__":
+    main()
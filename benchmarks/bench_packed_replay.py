@@ -0,0 +1,54 @@
+# footprint and speed of the bit-packed replay memory against the float32 one
+# both buffers get the same experiences, so their batches must be identical
+# run from the repo root: python benchmarks/bench_packed_replay.py
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from replay_buffer import ReplayBuffer
+
+CAPACITY = 100_000
+BATCH_SIZE = 1000
+
+def time_it(fn, repeats):
+    fn() # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+def main():
+    rng = np.random.default_rng(0)
+    states = rng.integers(0, 2, size=(CAPACITY + 1, 11))
+    actions = rng.integers(0, 3, size=CAPACITY)
+    rewards = rng.choice([-1.0, 30.0, -10.0], size=CAPACITY)
+    dones = rng.random(CAPACITY) < 0.02
+
+    buffers = {"float32": ReplayBuffer(CAPACITY, 11, seed=0), "packed": ReplayBuffer(CAPACITY, 11, seed=0, packed=True)}
+    print(f"{'layout':<8} {'bytes/exp':>10} {'MB':>7} {'append us':>10} {'extend 1k us':>13} {'batch us':>9}")
+    for name, buffer in buffers.items():
+        footprint = sum(array.nbytes for array in buffer.arrays)
+        i = iter(range(10 ** 9))
+        def append():
+            k = next(i) % CAPACITY
+            buffer.append(states[k], actions[k], rewards[k], states[k + 1], dones[k])
+        append_time = time_it(append, 20000)
+        extend_time = time_it(lambda: buffer.extend(states[:1000], actions[:1000], rewards[:1000],
+                                                    states[1:1001], dones[:1000]), 200)
+        # fill it with the same experiences as the other layout
+        buffer.position = buffer.size = 0
+        buffer.extend(states[:-1], actions, rewards, states[1:], dones)
+        idx = rng.integers(0, CAPACITY, size=BATCH_SIZE)
+        batch_time = time_it(lambda: buffer.get_batch(idx), 500)
+        print(f"{name:<8} {footprint / CAPACITY:>10.1f} {footprint / 1e6:>7.1f} {append_time * 1e6:>10.2f} "
+              f"{extend_time * 1e6:>13.1f} {batch_time * 1e6:>9.1f}")
+
+    idx = rng.integers(0, CAPACITY, size=BATCH_SIZE)
+    same = all(torch.equal(a, b) for a, b in zip(buffers["float32"].get_batch(idx), buffers["packed"].get_batch(idx)))
+    print(f"same batches: {same}")
+
+if __name__ == "__main__":
+    main()
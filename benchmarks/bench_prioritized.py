@@ -0,0 +1,46 @@
+# sampling throughput of the prioritized replay sum tree
+# run from the repo root: python benchmarks/bench_prioritized.py
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from prioritized_replay import SumTree
+
+CAPACITIES = [100_000, 10_000_000]
+BATCH_SIZE = 1000
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'capacity':>10} {'sample ms':>10} {'samples/s':>12} {'update ms':>10} {'set us':>8}")
+    for capacity in CAPACITIES:
+        tree = SumTree(capacity)
+        # fill every leaf in chunks, most steps cheap and a few rare big ones
+        chunk = 1_000_000
+        for start in range(0, capacity, chunk):
+            idx = np.arange(start, min(start + chunk, capacity))
+            tree.update(idx, np.where(rng.random(len(idx)) < 0.05, 10.0, 1.0))
+
+        repeats = 200
+        start = time.perf_counter()
+        for _ in range(repeats):
+            segment = tree.total() / BATCH_SIZE
+            idx = tree.find((np.arange(BATCH_SIZE) + rng.random(BATCH_SIZE)) * segment)
+        sample_time = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            tree.update(idx, rng.random(BATCH_SIZE))
+        update_time = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for i in range(10_000):
+            tree.set(i, 1.0)
+        set_time = (time.perf_counter() - start) / 10_000
+
+        print(f"{capacity:>10} {sample_time * 1e3:>10.3f} {BATCH_SIZE / sample_time:>12.0f} "
+              f"{update_time * 1e3:>10.3f} {set_time * 1e6:>8.2f}")
+
+if __name__ == "__main__":
+    main()
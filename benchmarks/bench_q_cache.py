@@ -0,0 +1,59 @@
+# per-step cost of the training loop with and without the q value table
+# every setting plays the same seeded games with no exploration and trains on
+# every frame the way run() does by default (quick_memory), then the table is
+# checked against the live model
+# run from the repo root: python benchmarks/bench_q_cache.py
+import os
+import sys
+import time
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_agent import SnakeGameAgent
+from snake_agent import Agent
+
+STEPS = 3000
+SETTINGS = [None, 1, 10, 100] # q_cache_every, None is no cache
+
+def play(q_cache_every):
+    torch.manual_seed(0)
+    agent = Agent(seed=0, q_cache_every=q_cache_every)
+    agent.n_games = 1000 # no exploration, every move comes from the model
+    game = SnakeGameAgent(render_mode="none", seed=0)
+    move_time = 0.0
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        state = agent.get_game_state(game)
+        t = time.perf_counter()
+        move = agent.get_move(game, state)
+        move_time += time.perf_counter() - t
+        reward, done = game.make_a_step(move)
+        next_state = agent.get_game_state(game)
+        agent.quick_memory(state, move, reward, next_state, done)
+        if done:
+            game.reset()
+    total = time.perf_counter() - start
+    return agent, total / STEPS, move_time / STEPS
+
+def main():
+    print(f"{'q cache':<10} {'step us':>9} {'get_move us':>12} {'refreshes':>10} {'stale updates':>14} {'max error':>10}")
+    for every in SETTINGS:
+        agent, step_time, move_time = play(every)
+        name = "off" if every is None else f"every {every}"
+        if agent.q_cache is None:
+            print(f"{name:<10} {step_time * 1e6:>9.1f} {move_time * 1e6:>12.1f}")
+            continue
+        stale = agent.q_cache.staleness()
+        print(f"{name:<10} {step_time * 1e6:>9.1f} {move_time * 1e6:>12.1f} {agent.q_cache.n_refreshes:>10} "
+              f"{stale['updates']:>14} {stale['max_error']:>10.2e}")
+
+    # a fresh table has to agree with the model it was built from
+    agent = Agent(seed=0, q_cache_every=1)
+    all_states = agent.q_cache.all_states
+    with torch.inference_mode():
+        live = agent.model(all_states).numpy()
+    same = (agent.q_cache.act(all_states.numpy()) == live.argmax(axis=1)).all()
+    print(f"fresh table picks the model's moves on all 2048 states: {same}")
+
+if __name__ == "__main__":
+    main()
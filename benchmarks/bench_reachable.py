@@ -0,0 +1,99 @@
+# per-step cost of the reachable-space features on big boards with long snakes
+# a snake of fixed length walks a hamiltonian cycle of the board, so it never
+# dies and stays as long as asked. every step takes the new head cell and
+# frees the old tail cell, in the order the game does it, then looks up the
+# region size of the three cells around the head, once with the RegionTracker
+# and once with a plain flood fill from each of the three cells
+# run from the repo root: python benchmarks/bench_reachable.py
+import os
+import sys
+import time
+import argparse
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from regions import RegionTracker
+
+BOARDS = [20, 50, 100] # square boards, an even number of rows
+LENGTHS = [0.1, 0.5, 0.9] # snake length as a share of the board
+
+# the cells of a hamiltonian cycle: along row 0, back and forth over the
+# other rows without column 0, and up column 0 to the start
+def cycle(rows, cols):
+    cells = list(range(cols))
+    for r in range(1, rows):
+        row = range(cols - 1, 0, -1) if r % 2 else range(1, cols)
+        cells.extend(r * cols + c for c in row)
+    cells.extend(r * cols for r in range(rows - 1, 0, -1))
+    return cells
+
+# the up to 3 cells next to head other than the one the snake came from
+def candidates(tracker, head, neck):
+    return [cell for cell in tracker.neighbours[head] if cell != neck]
+
+def flood_size(grid, neighbours, start):
+    if grid[start]:
+        return 0
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        cell = queue.popleft()
+        for nb in neighbours[cell]:
+            if not grid[nb] and nb not in seen:
+                seen.add(nb)
+                queue.append(nb)
+    return len(seen)
+
+def percentile(times, p):
+    times = sorted(times)
+    return times[min(len(times) - 1, int(len(times) * p))]
+
+def walk(size, share, steps, naive):
+    rows = cols = size
+    path = cycle(rows, cols)
+    length = max(3, int(len(path) * share))
+    grid = bytearray(rows * cols)
+    for cell in path[:length]:
+        grid[cell] = 1
+    tracker = RegionTracker.from_grid(rows, cols, grid)
+    neighbours = tracker.neighbours
+    times = []
+    for step in range(steps):
+        head = path[(length + step) % len(path)]
+        neck = path[(length + step - 1) % len(path)]
+        tail = path[step % len(path)]
+        start = time.perf_counter()
+        grid[head] = 1
+        grid[tail] = 0
+        if naive:
+            sizes = [flood_size(grid, neighbours, cell) for cell in candidates(tracker, head, neck)]
+        else:
+            tracker.occupy(head)
+            tracker.release(tail)
+            sizes = [tracker.size_at(cell) for cell in candidates(tracker, head, neck)]
+        times.append(time.perf_counter() - start)
+        if not naive and step % 97 == 0:
+            # the incremental sizes have to match a flood fill
+            assert sizes == [flood_size(grid, neighbours, cell) for cell in candidates(tracker, head, neck)]
+    return length, times
+
+def main():
+    parser = argparse.ArgumentParser(description="reachable-space features, incremental vs flood fill")
+    parser.add_argument("--steps", type=int, default=20000, help="steps with the region tracker")
+    parser.add_argument("--naive-steps", type=int, default=300, help="steps with a flood fill per lookup")
+    args = parser.parse_args()
+
+    print(f"{'board':<9} {'length':>7} {'method':<11} {'mean us':>10} {'p99 us':>10} {'max us':>10} {'speedup':>9}")
+    for size in BOARDS:
+        for share in LENGTHS:
+            length, fast = walk(size, share, args.steps, naive=False)
+            _, slow = walk(size, share, args.naive_steps, naive=True)
+            fast_mean = sum(fast) / len(fast)
+            slow_mean = sum(slow) / len(slow)
+            for name, times in [("tracker", fast), ("flood fill", slow)]:
+                speedup = f"{slow_mean / fast_mean:>8.0f}x" if name == "tracker" else ""
+                print(f"{size}x{size:<6} {length:>7} {name:<11} {sum(times) / len(times) * 1e6:>10.1f} "
+                      f"{percentile(times, 0.99) * 1e6:>10.1f} {max(times) * 1e6:>10.1f} {speedup:>9}")
+
+if __name__ == "__main__":
+    main()
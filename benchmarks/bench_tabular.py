@@ -0,0 +1,68 @@
+# head to head: wall-clock time for each backend to reach an average score
+# both play the same seeded headless games with the default schedule of run()
+# (an update on every frame and a replay batch when a game ends) until the
+# mean score of the last WINDOW games reaches TARGET or the time budget runs out
+# run from the repo root: python benchmarks/bench_tabular.py --target 5 --budget 600
+import os
+import sys
+import time
+import argparse
+from collections import deque
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_agent import SnakeGameAgent
+from snake_agent import Agent
+
+WINDOW = 50
+
+def train_until(backend, target, budget, seed=0):
+    torch.manual_seed(seed)
+    agent = Agent(seed=seed, backend=backend)
+    game = SnakeGameAgent(render_mode="none", seed=seed)
+    scores = deque(maxlen=WINDOW)
+    train_time = 0.0
+    start = time.perf_counter()
+    while time.perf_counter() - start < budget:
+        state = agent.get_game_state(game)
+        move = agent.get_move(game, state)
+        reward, done = game.make_a_step(move)
+        agent.n_steps += 1
+        next_state = agent.get_game_state(game)
+        agent.add_experience(state, move, reward, next_state, done)
+        t = time.perf_counter()
+        agent.quick_memory(state, move, reward, next_state, done)
+        train_time += time.perf_counter() - t
+        if done:
+            scores.append(game.score)
+            game.reset()
+            agent.n_games += 1
+            t = time.perf_counter()
+            agent.experience_replay()
+            train_time += time.perf_counter() - t
+            if len(scores) == WINDOW and sum(scores) / WINDOW >= target:
+                break
+    return {
+        "seconds": time.perf_counter() - start,
+        "reached": len(scores) == WINDOW and sum(scores) / WINDOW >= target,
+        "mean_score": sum(scores) / max(1, len(scores)),
+        "games": agent.n_games,
+        "frames": agent.n_steps,
+        "train_us_per_frame": train_time / max(1, agent.n_steps) * 1e6,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="time for each backend to reach an average score")
+    parser.add_argument("--target", type=float, default=5.0, help=f"mean score over the last {WINDOW} games")
+    parser.add_argument("--budget", type=float, default=600.0, help="seconds each backend gets at most")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'backend':<9} {'reached':>8} {'seconds':>9} {'games':>7} {'frames':>9} {'mean score':>11} {'train us/frame':>15}")
+    for backend in ["tabular", "mlp"]:
+        r = train_until(backend, args.target, args.budget, args.seed)
+        print(f"{backend:<9} {str(r['reached']):>8} {r['seconds']:>9.1f} {r['games']:>7} {r['frames']:>9} "
+              f"{r['mean_score']:>11.2f} {r['train_us_per_frame']:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# microbenchmark for QTrainer.experienced_learning
+# compares the batched update against the old per-sample python loop
+# run from the repo root: python benchmarks/bench_trainer.py
+import os
+import sys
+import time
+import copy
+import torch
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trainer import QTrainer
+from model import QNet
+
+BATCH_SIZES = [1, 64, 1000, 10000]
+
+# the update as it was written before batching, kept here as the reference
+def loop_learning(trainer, state, action, reward, next_state, done):
+    state = torch.tensor(np.array(state), dtype=torch.float)
+    next_state = torch.tensor(np.array(next_state), dtype=torch.float)
+    action = torch.tensor(np.array(action), dtype=torch.long)
+    reward = torch.tensor(np.array(reward), dtype=torch.float)
+
+    pred = trainer.model(state)
+    target = pred.clone()
+    for idx in range(len(done)):
+        Q_new = reward[idx]
+        if not done[idx]:
+            Q_new = reward[idx] + trainer.gamma * torch.max(trainer.model(next_state[idx]))
+        target[idx][torch.argmax(action[idx]).item()] = Q_new
+
+    trainer.optimizer.zero_grad()
+    loss = trainer.loss_function(target, pred)
+    loss.backward()
+    trainer.optimizer.step()
+
+def make_batch(rng, n):
+    states = rng.integers(0, 2, size=(n, 11))
+    next_states = rng.integers(0, 2, size=(n, 11))
+    actions = np.eye(3, dtype=int)[rng.integers(0, 3, size=n)]
+    rewards = rng.choice([-1, 30, -10], size=n)
+    dones = rng.random(n) < 0.05
+    return states, actions, rewards, next_states, dones
+
+def time_it(fn, repeats):
+    fn() # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+# both versions must leave the model with the same weights
+def check_same_update(batch):
+    torch.manual_seed(0)
+    model = QNet(11, 256, 3)
+    loop_trainer = QTrainer(0.9, 0.001, copy.deepcopy(model))
+    batched_trainer = QTrainer(0.9, 0.001, copy.deepcopy(model))
+    loop_learning(loop_trainer, *batch)
+    batched_trainer.experienced_learning(*batch)
+    for a, b in zip(loop_trainer.model.parameters(), batched_trainer.model.parameters()):
+        if not torch.allclose(a, b, atol=1e-6):
+            return False
+    return True
+
+def main():
+    rng = np.random.default_rng(0)
+    torch.manual_seed(0)
+    print(f"same update as loop: {check_same_update(make_batch(rng, 256))}")
+    print(f"{'batch':>8} {'loop ms':>10} {'batched ms':>11} {'speed-up':>9}")
+    for n in BATCH_SIZES:
+        batch = make_batch(rng, n)
+        trainer = QTrainer(0.9, 0.001, QNet(11, 256, 3))
+        repeats = max(3, 2000 // n)
+        loop_time = time_it(lambda: loop_learning(trainer, *batch), repeats)
+        batched_time = time_it(lambda: trainer.experienced_learning(*batch), repeats)
+        print(f"{n:>8} {loop_time * 1e3:>10.3f} {batched_time * 1e3:>11.3f} {loop_time / batched_time:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
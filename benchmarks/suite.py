@@ -0,0 +1,206 @@
+# benchmark suite for the hot paths of the game / agent / trainer stack
+# every benchmark is seeded so two runs on the same machine are comparable
+# results are written to a json file, and --compare checks them against an
+# older file and flags everything that got slower than the threshold
+# run from the repo root:
+#   python cli.py bench --output bench.json
+#   python cli.py bench --output new.json --compare bench.json --threshold 0.1
+import os
+import sys
+import json
+import time
+import random
+import platform
+
+# rendered benchmarks draw to an offscreen surface when there is no display
+if "DISPLAY" not in os.environ:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_agent import SnakeGameAgent, Point, BLOCK
+from snake_agent import Agent, POSSIBLE
+from trainer import QTrainer
+from model import QNet
+from free_cells import FreeCells
+
+SEED = 0
+
+def seed_everything(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+# call fn n times and time every call on its own
+# between() runs before each call without being timed
+def measure(fn, n, between=None):
+    times = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        if between is not None:
+            between()
+        start = time.perf_counter_ns()
+        fn()
+        times[i] = time.perf_counter_ns() - start
+    times /= 1e3 # microseconds
+    return {
+        "n": n,
+        "ops_per_sec": 1e6 / times.mean(),
+        "mean_us": times.mean(),
+        "p50_us": float(np.percentile(times, 50)),
+        "p90_us": float(np.percentile(times, 90)),
+        "p99_us": float(np.percentile(times, 99)),
+    }
+
+# a game that plays random moves and resets itself (untimed) when it ends
+def stepping(game, rng):
+    moves = [POSSIBLE[i] for i in rng.integers(0, 3, size=1024)]
+    state = {"i": 0, "done": False}
+    def step():
+        _, state["done"] = game.make_a_step(moves[state["i"] % len(moves)])
+        state["i"] += 1
+    def between():
+        if state["done"]:
+            game.reset()
+            state["done"] = False
+    return step, between
+
+def bench_make_a_step(n):
+    results = {}
+    for mode in ["none", "every_k"]:
+        seed_everything()
+        # every_k with k = 1 draws every frame but does not wait on the clock
+        game = SnakeGameAgent(render_mode=mode, render_every=1, seed=SEED)
+        step, between = stepping(game, np.random.default_rng(SEED))
+        name = "headless" if mode == "none" else "rendered"
+        results[f"make_a_step[{name}]"] = measure(step, n, between)
+    return results
+
+def bench_agent(n):
+    seed_everything()
+    agent = Agent(seed=SEED)
+    game = SnakeGameAgent(render_mode="none", seed=SEED)
+    step, between = stepping(game, np.random.default_rng(SEED))
+    results = {}
+
+    # featurize directly, get_game_state would just return the cached state
+    def advance():
+        between()
+        step()
+    results["get_game_state"] = measure(lambda: agent.featurize(game), n, advance)
+
+    state = agent.featurize(game)
+    agent.n_games = 1000 # no exploration, always the network
+    results["get_move"] = measure(lambda: agent.get_move(game, state), n)
+
+    rng = np.random.default_rng(SEED)
+    states = rng.integers(0, 2, size=(n, 11))
+    actions = [POSSIBLE[i] for i in rng.integers(0, 3, size=n)]
+    i = iter(range(n))
+    def add():
+        k = next(i)
+        agent.add_experience(states[k], actions[k], -1, states[(k + 1) % n], False)
+    results["add_experience"] = measure(add, n)
+    results["experience_replay"] = measure(agent.experience_replay, max(5, n // 200))
+    return results
+
+def bench_trainer(n, batch_sizes=(1, 64, 1000)):
+    results = {}
+    for batch_size in batch_sizes:
+        seed_everything()
+        trainer = QTrainer(0.9, 0.001, QNet(11, 256, 3))
+        rng = np.random.default_rng(SEED)
+        states = rng.integers(0, 2, size=(batch_size, 11))
+        next_states = rng.integers(0, 2, size=(batch_size, 11))
+        actions = np.eye(3, dtype=int)[rng.integers(0, 3, size=batch_size)]
+        rewards = rng.choice([-1, 30, -10], size=batch_size)
+        dones = rng.random(batch_size) < 0.05
+        repeats = max(5, n // max(1, batch_size // 4))
+        results[f"experienced_learning[batch={batch_size}]"] = measure(
+            lambda: trainer.experienced_learning(states, actions, rewards, next_states, dones), repeats)
+    return results
+
+def bench_place_food(n, lengths=(3, 100, 400, 700)):
+    results = {}
+    for length in lengths:
+        seed_everything()
+        game = SnakeGameAgent(render_mode="none", seed=SEED)
+        # lay the snake out as a zig-zag over the rows until it is long enough
+        cells = [(c if r % 2 == 0 else game.cols - 1 - c, r) for r in range(game.rows) for c in range(game.cols)]
+        game.snake_body.clear()
+        game.grid = bytearray(game.rows * game.cols)
+        game.free_cells = FreeCells(game.rows * game.cols, game.rng)
+        for x, y in cells[:length]:
+            game.push_head(Point(x * BLOCK, y * BLOCK))
+        results[f"place_food_randomly[length={length}]"] = measure(game.place_food_randomly, n)
+    return results
+
+BENCHMARKS = {
+    "make_a_step": bench_make_a_step,
+    "agent": bench_agent,
+    "trainer": bench_trainer,
+    "place_food": bench_place_food,
+}
+
+def run_suite(n, only=None):
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only and not any(o in name for o in only):
+            continue
+        results.update(bench(n))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": SEED,
+            "n": n,
+        },
+        "results": results,
+    }
+
+# returns the benchmarks whose ops/sec dropped by more than threshold
+def compare(new, old, threshold):
+    regressions = []
+    print(f"{'benchmark':<40} {'old ops/s':>12} {'new ops/s':>12} {'change':>8}")
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before = old["results"][name]["ops_per_sec"]
+        after = result["ops_per_sec"]
+        change = after / before - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<40} {before:>12.0f} {after:>12.0f} {change:>+7.1%}{flag}")
+    return regressions
+
+def print_results(report):
+    print(f"{'benchmark':<40} {'ops/s':>12} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9}")
+    for name, r in report["results"].items():
+        print(f"{name:<40} {r['ops_per_sec']:>12.0f} {r['p50_us']:>9.1f} {r['p90_us']:>9.1f} {r['p99_us']:>9.1f}")
+
+# run the suite, write it to output and compare it against compare_path if given
+# returns the names of the benchmarks that regressed
+def run(n=2000, only=None, output="bench.json", compare_path=None, threshold=0.1):
+    report = run_suite(n, only)
+    print_results(report)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    regressions = []
+    if compare_path:
+        with open(compare_path) as f:
+            old = json.load(f)
+        regressions = compare(report, old, threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+# the options live in cli.py, this is the same as python cli.py bench
+if __name__ == "__main__":
+    from cli import main
+    main(["bench"] + sys.argv[1:])
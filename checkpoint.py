@@ -0,0 +1,79 @@
+# this class saves and restores a training run
+# the model, the adam state and the counters go into one file that is
+# written to a temporary name and then renamed, so a crash mid write never
+# leaves a broken checkpoint behind. the replay memory is not copied at all,
+# it already lives in memory-mapped files inside the checkpoint folder and
+# only has to be flushed. the writing happens on a background thread, the
+# training loop only pays for copying the small model and optimizer state
+import os
+import copy
+import threading
+import torch
+
+CHECKPOINT_FILE = "checkpoint.pt"
+REPLAY_FOLDER = "replay"
+
+class Checkpointer:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.thread = None
+
+    # folder the agent's replay memory should be mapped from
+    def replay_path(self):
+        return os.path.join(self.directory, REPLAY_FOLDER)
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.directory, CHECKPOINT_FILE))
+
+    # start writing a checkpoint in the background
+    # returns False without doing anything if the previous one is still being written
+    def save(self, agent, record):
+        if self.thread is not None and self.thread.is_alive():
+            return False
+        state = {
+            "model": copy.deepcopy(agent.model.state_dict()),
+            # the tabular backend has no optimizer
+            "optimizer": copy.deepcopy(agent.trainer.optimizer.state_dict()) if agent.trainer.optimizer is not None else None,
+            "n_games": agent.n_games,
+            "n_steps": agent.n_steps,
+            "n_updates": agent.trainer.n_updates,
+            "epsilon": agent.epsilon,
+            "record": record,
+            "rng": agent.rng.getstate(),
+            "np_rng": agent.np_rng.bit_generator.state,
+            "memory": agent.memory.state_dict(),
+        }
+        self.thread = threading.Thread(target=self.write, args=(agent.memory, state), daemon=True)
+        self.thread.start()
+        return True
+
+    def write(self, memory, state):
+        # the memory goes to disk first so the checkpoint never points at experiences that are not there yet
+        memory.flush()
+        file = os.path.join(self.directory, CHECKPOINT_FILE)
+        tmp = file + ".tmp"
+        torch.save(state, tmp)
+        os.replace(tmp, file)
+
+    # block until the last checkpoint is on disk
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+
+    # restore the agent from the checkpoint, returns the record score
+    # the agent's memory must already be mapped from replay_path()
+    def load(self, agent):
+        state = torch.load(os.path.join(self.directory, CHECKPOINT_FILE))
+        agent.model.load_state_dict(state["model"])
+        if state["optimizer"] is not None:
+            agent.trainer.optimizer.load_state_dict(state["optimizer"])
+        agent.n_games = state["n_games"]
+        agent.n_steps = state["n_steps"]
+        # older checkpoints did not keep the update count
+        agent.trainer.n_updates = state.get("n_updates", 0)
+        agent.epsilon = state["epsilon"]
+        agent.rng.setstate(state["rng"])
+        agent.np_rng.bit_generator.state = state["np_rng"]
+        agent.memory.load_state_dict(state["memory"])
+        return state["record"]
@@ -0,0 +1,169 @@
+# one entry point for everything the project can do
+#   python cli.py train --render none --checkpoint-dir checkpoints/
+#   python cli.py distributed --actors 3 --duration 600
+#   python cli.py eval checkpoints/ --episodes 2000
+#   python cli.py play
+#   python cli.py replay episodes/ --episode 12 --render --fps 30
+#   python cli.py view   (while a train --live run is going)
+#   python cli.py bench --output bench.json
+# --profile-steps profiles with cProfile. for a sampling profile of a run
+# that is not slowed down by the profiler, install py-spy (pip install py-spy)
+# and run: py-spy record -o profile.svg -- python cli.py train --render none
+# every command imports what it needs only once it runs, so looking at
+# --help or starting one command never pays for the others (torch alone
+# takes over a second to import)
+import sys
+import json
+import argparse
+
+# argparse type for counts that have to be at least 1
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def train(args):
+    from snake_agent import run
+    from schedule import TrainingSchedule
+    schedule = TrainingSchedule(train_every=args.train_every, updates_per_step=args.updates_per_step,
+                                batch_size=args.batch_size, warmup=args.warmup,
+                                short_memory=not args.no_short_memory)
+    run(render_mode=args.render, render_every=args.render_every, prioritized=args.prioritized,
+        checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every, resume=args.resume,
+        log_every=args.log_every, timing=args.timing,
+        profile_steps=args.profile_steps, profile_output=args.profile_output, schedule=schedule,
+        record_path=args.record, n_step=args.n_step,
+        memory_size=args.memory_size, packed_memory=args.packed_memory, q_cache_every=args.q_cache,
+        backend=args.backend, live=args.live, live_every=args.live_every,
+        reachable=args.reachable)
+
+def distributed(args):
+    from distributed import run_distributed
+    run_distributed(n_actors=args.actors, publish_every=args.publish_every, chunk_size=args.chunk_size,
+                    seed=args.seed, prioritized=args.prioritized, duration=args.duration,
+                    report_every=args.report_every, n_step=args.n_step)
+
+def evaluate(args):
+    from evaluate import evaluate, load_model_state
+    report = evaluate(load_model_state(args.checkpoint), args.episodes, args.workers, args.seed, args.max_steps)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+def play(args):
+    from game import play
+    print(f"Score: {play()}")
+
+def replay(args):
+    from recording import EpisodeLog, replay
+    log = EpisodeLog(args.log)
+    if args.episode is None:
+        print(json.dumps(log.summary(), indent=2))
+        return
+    entry = log[args.episode]
+    game = replay(log, args.episode, render=args.render, fps=args.fps)
+    print(f"Episode {args.episode} - Seed: {entry['seed']} - Steps: {entry['steps']} - "
+          f"Score: {game.score} (recorded {entry['score']})")
+
+def view(args):
+    from live import view
+    view(args.name, args.fps)
+
+def bench(args):
+    from benchmarks import suite
+    regressions = suite.run(args.n, args.only, args.output, args.compare, args.threshold)
+    if regressions:
+        sys.exit(1)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="train, evaluate, play or benchmark the snake agent")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # BATCH_SIZE and MAX_MEMORY are repeated here so building the parser does not import torch
+    p = commands.add_parser("train", help="train the agent")
+    p.add_argument("--render", choices=["human", "every_k", "none"], default="human")
+    p.add_argument("--render-every", type=int, default=1)
+    p.add_argument("--prioritized", action="store_true")
+    p.add_argument("--checkpoint-dir", default=None)
+    p.add_argument("--checkpoint-every", type=int, default=100)
+    p.add_argument("--resume", action="store_true")
+    p.add_argument("--log-every", type=int, default=1)
+    p.add_argument("--timing", action="store_true")
+    p.add_argument("--profile-steps", type=int, default=None,
+                   help="run this many frames under cProfile and print the slowest calls "
+                        "(for a sampling profile instead: pip install py-spy, then "
+                        "py-spy record -o profile.svg -- python cli.py train --render none)")
+    p.add_argument("--profile-output", default="run.prof")
+    p.add_argument("--train-every", type=int, default=None, help="frames between replay updates, default is once per game")
+    p.add_argument("--updates-per-step", type=int, default=1)
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.add_argument("--warmup", type=int, default=0)
+    p.add_argument("--no-short-memory", action="store_true", help="skip the batch-of-one update on every frame")
+    p.add_argument("--record", default=None, help="keep every game in an episode log in this folder")
+    p.add_argument("--n-step", type=positive_int, default=1, help="learn from n-step returns instead of single rewards")
+    p.add_argument("--memory-size", type=int, default=100_000, help="experiences the replay memory holds")
+    p.add_argument("--packed-memory", action="store_true", help="bit-pack the replay memory, about 11x less ram")
+    p.add_argument("--backend", choices=["mlp", "tabular"], default="mlp",
+                   help="learn with the QNet or with a q table over every state")
+    p.add_argument("--live", nargs="?", const="snake_live", default=None, metavar="NAME",
+                   help="publish the game for python cli.py view, in a shared memory block called NAME")
+    p.add_argument("--live-every", type=int, default=1, help="publish one frame in every this many")
+    p.add_argument("--reachable", action="store_true",
+                   help="add flags for moves into a free region too small for the snake")
+    p.add_argument("--q-cache", type=int, default=None, metavar="K",
+                   help="look q values up in a table of every state, rebuilt every K updates")
+    p.set_defaults(func=train)
+
+    p = commands.add_parser("distributed", help="train with actor processes playing for one learner")
+    p.add_argument("--actors", type=positive_int, default=None, help="actor processes, default one per spare core")
+    p.add_argument("--publish-every", type=positive_int, default=50, help="learner updates between weight publishes")
+    p.add_argument("--chunk-size", type=positive_int, default=256, help="transitions an actor sends at once")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--prioritized", action="store_true")
+    p.add_argument("--duration", type=float, default=None, help="seconds to train for, default forever")
+    p.add_argument("--report-every", type=float, default=10, help="seconds between throughput reports")
+    p.add_argument("--n-step", type=positive_int, default=1, help="learn from n-step returns instead of single rewards")
+    p.set_defaults(func=distributed)
+
+    p = commands.add_parser("eval", help="evaluate a trained agent greedily")
+    p.add_argument("checkpoint", help="checkpoint folder or .pt file")
+    p.add_argument("--episodes", type=int, default=1000)
+    p.add_argument("--workers", type=int, default=None, help="processes to use, default one per core")
+    p.add_argument("--seed", type=int, default=0, help="seed of the first episode")
+    p.add_argument("--max-steps", type=int, default=None, help="cut episodes off after this many steps")
+    p.add_argument("--output", default=None, help="also write the report to this json file")
+    p.set_defaults(func=evaluate)
+
+    p = commands.add_parser("play", help="play the game with the arrow keys")
+    p.set_defaults(func=play)
+
+    p = commands.add_parser("replay", help="play a recorded game again")
+    p.add_argument("log", help="episode log folder written by train --record")
+    p.add_argument("--episode", type=int, default=None, help="episode to play, without it the log is summarized")
+    p.add_argument("--render", action="store_true", help="draw the game")
+    p.add_argument("--fps", type=float, default=None, help="frames per second when drawing, default as fast as possible")
+    p.set_defaults(func=replay)
+
+    p = commands.add_parser("view", help="watch a training run started with train --live")
+    p.add_argument("--name", default="snake_live", help="shared memory block the run publishes in")
+    p.add_argument("--fps", type=int, default=30)
+    p.set_defaults(func=view)
+
+    p = commands.add_parser("bench", help="benchmark the game, agent and trainer")
+    p.add_argument("--output", default="bench.json", help="where to write the results")
+    p.add_argument("--compare", default=None, help="older results file to compare against")
+    p.add_argument("--threshold", type=float, default=0.1, help="slowdown that counts as a regression")
+    p.add_argument("-n", type=int, default=2000, help="timed calls per benchmark")
+    p.add_argument("--only", nargs="*", help="only run these groups: make_a_step, agent, trainer, place_food")
+    p.set_defaults(func=bench)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# distributed training: several actor processes play headless games and
+# one learner process trains on what they send back
+# actors -> learner: chunks of transitions through a torch multiprocessing
+#                    queue, the tensors travel through shared memory
+# learner -> actors: the learner copies its weights into a model that lives
+#                    in shared memory and bumps a version number, actors
+#                    reload when they see a new version
+import os
+import sys
+import time
+import queue
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from game_agent import SnakeGameAgent
+from snake_agent import Agent, BATCH_SIZE
+from model import QNet
+
+def actor_loop(actor_id, seed, transitions, shared_model, weights_lock, weights_version,
+               env_steps, stop, chunk_size, n_step=1):
+    # one thread per actor, the point is to use one core each
+    torch.set_num_threads(1)
+    torch.manual_seed(seed)
+    # exit without waiting for the queue to be flushed, the learner stops
+    # reading once it has asked the actors to stop
+    transitions.cancel_join_thread()
+    # just the model, exploration and the n-step window, the learner owns memory and training
+    agent = Agent(seed=seed, n_step=n_step, actor=True)
+    game = SnakeGameAgent(render_mode="none", seed=seed)
+
+    def load_weights():
+        with weights_lock:
+            agent.model.load_state_dict(shared_model.state_dict())
+            return weights_version.value
+    version = load_weights()
+
+    states, actions, rewards, next_states, dones, scores = [], [], [], [], [], []
+    while not stop.is_set():
+        state = agent.get_game_state(game)
+        move = agent.get_move(game, state)
+        reward, done = game.make_a_step(move)
+        next_state = agent.get_game_state(game)
+
+        # the actor keeps the n-step window, the learner only sees finished transitions
+        if agent.window is None:
+            completed = [(state, move.index(1), reward, next_state, done)]
+        else:
+            completed = agent.window.push(state, move.index(1), reward, next_state, done)
+        for s, a, r, s_next, d in completed:
+            states.append(s)
+            actions.append(a)
+            rewards.append(r)
+            next_states.append(s_next)
+            dones.append(d)
+
+        if done:
+            scores.append(game.score)
+            game.reset()
+            agent.n_games += 1
+
+        # ship a full chunk and pick up new weights if there are any
+        if len(actions) >= chunk_size:
+            chunk = (
+                actor_id,
+                torch.from_numpy(np.array(states, dtype=np.float32)),
+                torch.tensor(actions, dtype=torch.long),
+                torch.tensor(rewards, dtype=torch.float),
+                torch.from_numpy(np.array(next_states, dtype=np.float32)),
+                torch.tensor(dones, dtype=torch.bool),
+                scores,
+            )
+            # a full queue must not keep the actor from seeing stop
+            while not stop.is_set():
+                try:
+                    transitions.put(chunk, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            with env_steps.get_lock():
+                env_steps.value += len(actions)
+            states, actions, rewards, next_states, dones, scores = [], [], [], [], [], []
+            if weights_version.value != version:
+                version = load_weights()
+
+
+# n_actors: number of actor processes, defaults to one per spare core
+# publish_every: learner updates between weight publishes
+# chunk_size: transitions an actor collects before sending them
+# duration: seconds to train for, None trains forever
+# report_every: seconds between throughput reports
+# n_step: learn from n-step returns, see nstep.py
+def run_distributed(n_actors=None, publish_every=50, chunk_size=256, seed=0,
+                    prioritized=False, duration=None, report_every=10, n_step=1):
+    if n_actors is None:
+        n_actors = max(1, (os.cpu_count() or 2) - 1)
+
+    torch.manual_seed(seed)
+    learner = Agent(prioritized=prioritized, seed=seed, n_step=n_step)
+
+    # the published copy of the weights, shared with every actor
+    shared_model = QNet(11, 256, 3)
+    shared_model.load_state_dict(learner.model.state_dict())
+    shared_model.share_memory()
+    weights_lock = mp.Lock()
+    weights_version = mp.Value("i", 0)
+
+    transitions = mp.Queue(maxsize=4 * n_actors)
+    env_steps = mp.Value("q", 0)
+    stop = mp.Event()
+
+    # every actor gets its own seed
+    actors = []
+    for actor_id in range(n_actors):
+        p = mp.Process(target=actor_loop, args=(
+            actor_id, seed + 1 + actor_id, transitions, shared_model, weights_lock,
+            weights_version, env_steps, stop, chunk_size, n_step))
+        p.start()
+        actors.append(p)
+
+    record = 0
+    updates = 0
+    start = time.perf_counter()
+    last_report, last_steps, last_updates = start, 0, 0
+    try:
+        while duration is None or time.perf_counter() - start < duration:
+            # take everything the actors have sent so far
+            while True:
+                try:
+                    _, states, actions, rewards, next_states, dones, scores = transitions.get_nowait()
+                except queue.Empty:
+                    break
+                learner.memory.extend(states.numpy(), actions.numpy(), rewards.numpy(),
+                                      next_states.numpy(), dones.numpy())
+                for score in scores:
+                    learner.n_games += 1
+                    if score > record:
+                        record = score
+                    print(f"Game {learner.n_games} - Score: {score} - Record: {record}")
+
+            if len(learner.memory) < BATCH_SIZE:
+                time.sleep(0.001)
+                continue
+
+            learner.experience_replay()
+            updates += 1
+
+            # publish the new weights for the actors
+            if updates % publish_every == 0:
+                with weights_lock:
+                    for shared, local in zip(shared_model.parameters(), learner.model.parameters()):
+                        shared.data.copy_(local.data)
+                    weights_version.value += 1
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                steps = env_steps.value
+                elapsed = now - last_report
+                print(f"env steps/s: {(steps - last_steps) / elapsed:.0f} - "
+                      f"updates/s: {(updates - last_updates) / elapsed:.1f} - "
+                      f"replay size: {len(learner.memory)}")
+                last_report, last_steps, last_updates = now, steps, updates
+    finally:
+        stop.set()
+        # the actors see stop within a put timeout. nothing is read from the
+        # queue any more: its tensors live in the actors' shared memory and
+        # cannot be rebuilt once those processes are gone
+        for p in actors:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+        transitions.close()
+    return learner
+
+
+# the options live in cli.py, this is the same as python cli.py distributed
+if __name__ == "__main__":
+    from cli import main
+    main(["distributed"] + sys.argv[1:])
@@ -0,0 +1,110 @@
+# evaluate a trained QNet without any exploration
+# every episode gets its own seed (seed + episode index) and plays greedily
+# on a headless SnakeGameAgent, so an episode's result only depends on the
+# weights and its seed. the episodes are spread over a process pool and put
+# back in episode order, so the report is the same whatever the worker count
+# usage: python cli.py eval checkpoints/ --episodes 2000 --workers 8
+# the workers only need numpy and the game, torch is imported by the parent
+# alone to read the checkpoint, so starting a worker stays cheap
+import os
+import sys
+import multiprocessing as mp
+import numpy as np
+from game_agent import SnakeGameAgent
+from features import POSSIBLE, N_FEATURES, featurize
+from numpy_policy import NumpyPolicy
+from tabular import TabularQ
+
+# accepts a checkpoint folder, a checkpoint file or a file with just the model's state dict
+def load_model_state(path):
+    import torch
+    from checkpoint import CHECKPOINT_FILE
+    if os.path.isdir(path):
+        path = os.path.join(path, CHECKPOINT_FILE)
+    state = torch.load(path)
+    if "model" in state:
+        state = state["model"]
+    return state
+
+# each worker gets the policy once and reuses it for every episode it plays
+worker_policy = None
+worker_reachable = False
+
+def init_worker(policy):
+    global worker_policy, worker_reachable
+    worker_policy = policy
+    # a policy with more inputs was trained with the reachable-space features
+    worker_reachable = policy.n_features > N_FEATURES
+
+# play one greedy episode, returns (score, length, death)
+def play_episode(seed, max_steps=None):
+    game = SnakeGameAgent(render_mode="none", seed=seed)
+    steps = 0
+    while True:
+        state = featurize(game, worker_reachable)
+        _, done = game.make_a_step(POSSIBLE[worker_policy.act(state)])
+        steps += 1
+        if done:
+            return game.score, steps, game.death
+        if max_steps is not None and steps >= max_steps:
+            return game.score, steps, "max_steps"
+
+def summarize(results):
+    scores = np.array([r[0] for r in results])
+    lengths = np.array([r[1] for r in results])
+    deaths = {}
+    for _, _, death in results:
+        deaths[death] = deaths.get(death, 0) + 1
+    return {
+        "episodes": len(results),
+        "score": {
+            "mean": round(float(scores.mean()), 4),
+            "median": float(np.median(scores)),
+            "p10": float(np.percentile(scores, 10)),
+            "p25": float(np.percentile(scores, 25)),
+            "p75": float(np.percentile(scores, 75)),
+            "p90": float(np.percentile(scores, 90)),
+            "max": int(scores.max()),
+        },
+        "length": {
+            "mean": round(float(lengths.mean()), 4),
+            "median": float(np.median(lengths)),
+            "max": int(lengths.max()),
+        },
+        "deaths": dict(sorted(deaths.items())),
+    }
+
+# play greedy episodes with seeds seed .. seed + episodes - 1
+def evaluate(model_state, episodes=1000, workers=None, seed=0, max_steps=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    seeds = [seed + i for i in range(episodes)]
+    # a q table or a numpy copy of the QNet, the same float32 math in every
+    # process, so results never depend on the worker count
+    if "table" in model_state:
+        policy = TabularQ.from_state_dict(model_state)
+    else:
+        policy = NumpyPolicy.from_state_dict(model_state)
+    if workers <= 1:
+        init_worker(policy)
+        results = [play_episode(s, max_steps) for s in seeds]
+    else:
+        # spawn, not fork: a forked child can hang on torch's thread pool state
+        pool = mp.get_context("spawn").Pool(workers, initializer=init_worker, initargs=(policy,))
+        try:
+            # map keeps the episode order no matter which worker played what
+            results = pool.starmap(play_episode, [(s, max_steps) for s in seeds],
+                                   chunksize=max(1, episodes // (workers * 8)))
+            # let the workers finish on their own, terminating them can leave
+            # one of them holding the task queue lock and the pool never joins
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return summarize(results)
+
+if __name__ == "__main__":
+    from cli import main
+    main(["eval"] + sys.argv[1:])
@@ -0,0 +1,87 @@
+# the features the agent sees, built from a SnakeGameAgent
+# kept apart from snake_agent.py so a process that only plays (an
+# evaluation worker) can build states without importing torch
+import numpy as np
+from game_agent import Point, Direction
+
+# possible actions
+POSSIBLE = [[1,0,0], [0,1,0], [0,0,1]] # go straight, take a left, take a right
+
+# the original features, and with the three reachable-space flags added
+N_FEATURES = 11
+N_REACHABLE_FEATURES = 14
+
+# (straight, right, left) as (dx, dy) steps for every direction
+AHEAD = {
+    Direction.RIGHT: ((1, 0), (0, 1), (0, -1)),
+    Direction.LEFT: ((-1, 0), (0, -1), (0, 1)),
+    Direction.DOWN: ((0, 1), (-1, 0), (1, 0)),
+    Direction.UP: ((0, -1), (1, 0), (-1, 0)),
+}
+
+# reachable: add a flag for straight, right and left that is set when the
+# cell there is blocked or the free region around it has fewer cells than
+# the snake is long, so going there walls the snake in. the region sizes come
+# from the game's RegionTracker, which is started on the first call
+def featurize(game, reachable=False):
+    # state will look like this -
+    # state = [danger straight, danger right, danger left,
+    # direction left, right, down, up,
+    # food left, food right, food up, food down]
+    head = game.snake_body[0] # current snake head 
+    # checking danger points
+    point_left = Point(head.x-20, head.y)
+    point_right = Point(head.x+20, head.y)
+    point_down = Point(head.x, head.y+20)
+    point_up = Point(head.x, head.y-20)
+
+    # get current direction of snake as a set of booleans
+    direction_r = game.snake_direction == Direction.RIGHT
+    direction_d = game.snake_direction == Direction.DOWN
+    direction_l = game.snake_direction == Direction.LEFT
+    direction_u = game.snake_direction == Direction.UP
+
+    # create state 
+    state = [
+        # check where the danger is
+        # if danger is in the same direction as snake head 
+        (direction_r and game.check_collision(point_right)) or
+        (direction_l and game.check_collision(point_left)) or 
+        (direction_d and game.check_collision(point_down)) or 
+        (direction_u and game.check_collision(point_up)),
+
+        # check if danger is to the right
+        (direction_r and game.check_collision(point_down)) or
+        (direction_d and game.check_collision(point_left)) or
+        (direction_l and game.check_collision(point_up)) or
+        (direction_u and game.check_collision(point_right)),
+
+        # check if danger is to the left 
+        (direction_r and game.check_collision(point_up)) or
+        (direction_d and game.check_collision(point_right)) or
+        (direction_l and game.check_collision(point_down)) or
+        (direction_u and game.check_collision(point_left)),
+
+        # snake direction
+        direction_l,
+        direction_r,
+        direction_d,
+        direction_u,
+
+        # check food placement
+        game.snake_head.x > game.food.x, # left check
+        game.snake_head.x < game.food.x, # right check
+        game.snake_head.y > game.food.y, # down check
+        game.snake_head.y < game.food.y, # up check
+
+    ]
+
+    if reachable:
+        if game.regions is None:
+            game.track_regions()
+        length = len(game.snake_body)
+        for dx, dy in AHEAD[game.snake_direction]:
+            point = Point(head.x + dx * 20, head.y + dy * 20)
+            state.append(game.is_outside(point) or game.regions.size_at(game.cell(point)) < length)
+
+    return np.array(state, dtype = int) # return state for forward feed network
@@ -0,0 +1,37 @@
+# this class keeps track of the board cells the snake is not on
+# a dense list of the free cells plus the position of every cell in that
+# list, so removing a cell is a swap with the last one and a pop.
+# adding, removing and picking a random free cell are all O(1)
+import random
+
+class FreeCells:
+    def __init__(self, n_cells, rng=random):
+        self.rng = rng
+        self.cells = list(range(n_cells)) # the free cells, in no order
+        self.pos = list(range(n_cells)) # where each cell is in self.cells, -1 if taken
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return self.pos[cell] >= 0
+
+    # mark a cell as taken
+    def remove(self, cell):
+        i = self.pos[cell]
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[i] = last
+            self.pos[last] = i
+        self.pos[cell] = -1
+
+    # mark a cell as free again
+    def add(self, cell):
+        self.pos[cell] = len(self.cells)
+        self.cells.append(cell)
+
+    # uniformly random free cell, None if the board is full
+    def sample(self):
+        if not self.cells:
+            return None
+        return self.cells[self.rng.randrange(len(self.cells))]
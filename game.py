@@ -1,9 +1,7 @@
 # implementing base game
-import pygame
-import numpy as np
-import random
 from enum import Enum # defining directions right away
 from collections import namedtuple
+from free_cells import FreeCells
 
 # parts of the game
 # the background: rendered by pygame.display
@@ -20,9 +18,17 @@ from collections import namedtuple
 # 7. if snake hits walls or itself, game over
 
 
-# initialize the game
-pygame.init()
-font = pygame.font.SysFont('Arial', 20)
+# pygame is imported and initialized once there is a game to show, so
+# importing this module does not load SDL, same as game_agent.py
+pygame = None
+font = None
+
+def init_pygame():
+    global pygame, font
+    if font is None:
+        import pygame
+        pygame.init()
+        font = pygame.font.SysFont('Arial', 20)
 
 # make enum for directions for convenience
 class Direction(Enum):
@@ -52,29 +58,48 @@ class SnakeGame:
     def __init__(self, h=480, w=640):
         self.h = h
         self.w = w
+        # pygame is only set up once there is a game to show, not on import
+        init_pygame()
+        from renderer import DirtyRenderer
         self.display = pygame.display.set_mode((self.w, self.h))
         pygame.display.set_caption("SNAKE GAME")
         self.clock = pygame.time.Clock()
+        # only the cells that change each step get drawn
+        self.renderer = DirtyRenderer(self.display, font, BLUE1, BLOCK)
         self.snake_direction = Direction.RIGHT
         self.game_over = False
         # initialize the snake
         self.snake_head = Point(self.w // 2, self.h // 2)
         self.snake_body = [self.snake_head, Point(self.snake_head.x - BLOCK, self.snake_head.y), Point(self.snake_head.x - (2*BLOCK), self.snake_head.y)]
+        # cells with nothing on them, to place food without retrying
+        self.cols = self.w // BLOCK
+        self.free_cells = FreeCells((self.h // BLOCK) * self.cols)
+        for part in self.snake_body:
+            self.free_cells.remove(self.cell(part))
         self.food = None 
         self.score = 0
         self.place_food_randomly()
 
+    # index of the board cell under a point
+    def cell(self, point):
+        return (point.y // BLOCK) * self.cols + point.x // BLOCK
+
+    def is_outside(self, point):
+        return point.x > self.w - BLOCK or point.x < 0 or point.y < 0 or point.y > self.h - BLOCK
+
     def place_food_randomly(self):
-        # create new coordinates for food 
+        # pick a random cell the snake is not on
+        cell = self.free_cells.sample()
+        if cell is None:
+            # the snake fills the whole board, nothing left to eat
+            self.game_over = True
+            return
         # multiply by block to get actual coordinates on display
-        x = random.randint(0, (self.w // BLOCK) - 1) * BLOCK 
-        y = random.randint(0, (self.h // BLOCK) - 1) * BLOCK
+        x = (cell % self.cols) * BLOCK 
+        y = (cell // self.cols) * BLOCK
 
         self.food = Point(x,y)
-
-        # check if food has spawned on snake
-        if self.food in self.snake_body:
-            self.place_food_randomly()
+        self.renderer.mark(self.food)
     
     # this function gets input from the user and does one step ahead,
     # checks for collisions, checks for food consumption, updates score
@@ -105,13 +130,18 @@ class SnakeGame:
         # check if game is over 
         if self.game_over:
             return self.game_over
+        # the new head is on the board and not on the body
+        self.free_cells.remove(self.cell(self.snake_head))
+        self.renderer.mark(self.snake_head)
 
         # check if snake just ate food
         if self.snake_head == self.food:
             self.score += 1
             self.place_food_randomly()
         else:
-            self.snake_body.pop() # just a normal turn and no food consumed
+            tail = self.snake_body.pop() # just a normal turn and no food consumed
+            self.free_cells.add(self.cell(tail))
+            self.renderer.mark(tail)
         
         # once all checks are done, update ui to reflect move
         self.update_ui()
@@ -147,7 +177,12 @@ class SnakeGame:
             self.game_over = True
 
 
+    # only the cells that changed are drawn, see renderer.py
     def update_ui(self):
+        self.renderer.render(self)
+
+    # draw the whole board, the renderer adds the score and flips the screen
+    def draw_full(self):
         self.display.fill(BLACK) # fill display with black
         # draw every point of the snake
         for part in self.snake_body:
@@ -157,11 +192,17 @@ class SnakeGame:
         # draw food
         pygame.draw.rect(self.display, RED, pygame.Rect(self.food.x, self.food.y, BLOCK, BLOCK))
 
-        # write score near the top left 
-        score_text = font.render(f"Score: {self.score}", True, BLUE1)
-        self.display.blit(score_text, [10, 10])
-        # flip the screen to reflect changes
-        pygame.display.flip()
+    # draw whatever is on the cell at x, y now and return its rect
+    def draw_cell(self, x, y):
+        rect = pygame.Rect(x, y, BLOCK, BLOCK)
+        if self.cell(Point(x, y)) not in self.free_cells:
+            pygame.draw.rect(self.display, PINK, rect)
+            pygame.draw.rect(self.display, HOT_PINK, pygame.Rect(x+4, y+4, 12, 12))
+        elif x == self.food.x and y == self.food.y:
+            pygame.draw.rect(self.display, RED, rect)
+        else:
+            pygame.draw.rect(self.display, BLACK, rect)
+        return rect
 
 
     # testing 
@@ -182,12 +223,14 @@ class SnakeGame:
 
 
 # main game loop
-game = SnakeGame()
-while True:
-    done = game.make_a_step()
-    if done == True:
-        break
-
-
-pygame.quit()
-    
+def play():
+    game = SnakeGame()
+    while True:
+        done = game.make_a_step()
+        if done == True:
+            break
+    pygame.quit()
+    return game.score
+
+if __name__ == "__main__":
+    play()
@@ -1,10 +1,11 @@
 # this class is used to create an implementation of the game for an agent
 # implementing base game
-import pygame
-import numpy as np
 import random
 from enum import Enum # defining directions right away
-from collections import namedtuple
+from collections import namedtuple, deque
+from free_cells import FreeCells
+from instrumentation import NullTimers
+from regions import RegionTracker
 
 # parts of the game
 # the background: rendered by pygame.display
@@ -21,9 +22,17 @@ from collections import namedtuple
 # 7. if snake hits walls or itself, game over
 
 
-# initialize the game
-pygame.init()
-font = pygame.font.SysFont('Arial', 20)
+# pygame is imported and initialized by the first game that draws, so a
+# headless game (a training or evaluation worker) never loads SDL or a font
+pygame = None
+font = None
+
+def init_pygame():
+    global pygame, font
+    if font is None:
+        import pygame
+        pygame.init()
+        font = pygame.font.SysFont('Arial', 20)
 
 # make enum for directions for convenience
 class Direction(Enum):
@@ -48,40 +57,93 @@ BLACK = (0,0,0)
 BLOCK = 20
 SPEED = 80
 
+# render modes
+# human: draw and tick the clock every frame, same as playing by hand
+# every_k: draw one frame in every render_every frames, no clock
+# none: no window, no event pump, no clock, for training on a server
+RENDER_MODES = ("human", "every_k", "none")
+
 # main snake game class
 class SnakeGameAgent:
-    def __init__(self, h=480, w=640):
+    # seed: seeds this game's own random generator, so games in
+    # different processes do not share the global random module
+    def __init__(self, h=480, w=640, render_mode="human", render_every=1, seed=None):
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"render_mode must be one of {RENDER_MODES}, got {render_mode!r}")
         self.h = h
         self.w = w
-        self.display = pygame.display.set_mode((self.w, self.h))
-        pygame.display.set_caption("SNAKE GAME AGENT")
-        pygame.display.update()
-        self.clock = pygame.time.Clock()
+        # board size in cells, used by the occupancy grid
+        self.cols = w // BLOCK
+        self.rows = h // BLOCK
+        self.rng = random.Random(seed)
+        self.timers = NullTimers() # swapped for Timers to time the drawing
+        self.render_mode = render_mode
+        self.render_every = max(1, render_every)
+        self.display = None
+        self.clock = None
+        self.renderer = None
+        # headless games never open a window
+        if self.render_mode != "none":
+            init_pygame()
+            from renderer import DirtyRenderer
+            self.display = pygame.display.set_mode((self.w, self.h))
+            pygame.display.set_caption("SNAKE GAME AGENT")
+            pygame.display.update()
+            self.clock = pygame.time.Clock()
+            self.renderer = DirtyRenderer(self.display, font, BLUE1, BLOCK)
+        # the agent's state for the current frame is cached here, frame_version
+        # changes on every step and reset so a stale state is never reused
+        self.frame_version = 0
+        self.observation = None
+        self.observation_version = -1
+        self.regions = None # a RegionTracker once track_regions() was called
         self.reset()
     
-    def reset(self):
+    # seed: reseed the game's random generator first, so this episode's food
+    # only depends on the seed and the moves played (see recording.py)
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.frame_version += 1
         # initialize game state
         self.snake_direction = Direction.RIGHT
         self.snake_head = Point(self.w / 2, self.h / 2)
-        self.snake_body = [self.snake_head, Point(self.snake_head.x - BLOCK, self.snake_head.y), Point(self.snake_head.x - (2*BLOCK), self.snake_head.y)]
+        # the body is a deque so the head and tail move in O(1), and the
+        # grid counts how many body parts sit on each cell so collision
+        # checks do not have to scan the body
+        self.snake_body = deque()
+        self.grid = bytearray(self.rows * self.cols)
+        if self.regions is not None:
+            self.regions.reset()
+        # cells with nothing on them, to place food without retrying
+        self.free_cells = FreeCells(self.rows * self.cols, self.rng)
+        for part in [Point(self.snake_head.x - (2*BLOCK), self.snake_head.y), Point(self.snake_head.x - BLOCK, self.snake_head.y), self.snake_head]:
+            self.push_head(part)
         self.food = None 
         self.score = 0
         self.place_food_randomly()
         self.game_over = False
         self.nframes = 0
+        self.death = None # why the game ended: "collision", "timeout" or "board_full"
+        if self.renderer is not None:
+            self.renderer.reset()
 
 
     def place_food_randomly(self):
-        # create new coordinates for food 
+        # pick a random cell the snake is not on
+        cell = self.free_cells.sample()
+        if cell is None:
+            # the snake fills the whole board, nothing left to eat
+            self.game_over = True
+            self.death = "board_full"
+            return
         # multiply by block to get actual coordinates on display
-        x = random.randint(0, (self.w - BLOCK) // BLOCK) * BLOCK 
-        y = random.randint(0, (self.h - BLOCK) // BLOCK) * BLOCK
+        x = (cell % self.cols) * BLOCK
+        y = (cell // self.cols) * BLOCK
 
         self.food = Point(x,y)
-
-        # check if food has spawned on snake
-        if self.food in self.snake_body:
-            self.place_food_randomly()
+        if self.renderer is not None:
+            self.renderer.mark(self.food)
     
     # this function gets input from the user and does one step ahead,
     # checks for collisions, checks for food consumption, updates score
@@ -90,11 +152,14 @@ class SnakeGameAgent:
         # initialize reward
         reward = -1
         self.nframes += 1
-        # check events 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.game_over = True
-                return self.game_over
+        self.frame_version += 1
+        rendering = self.should_render()
+        # check events, only when there is a window to get them from
+        if rendering:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.game_over = True
+                    return reward, self.game_over
         # remove keypress implementation with agent predictions
         # directions = [RIGHT, DOWN, LEFT, UP]
         if direction_vector == [1, 0, 0]:  # Keep moving straight
@@ -120,11 +185,13 @@ class SnakeGameAgent:
         # once we have the new direction, we move the snake one block
         self.move_snake()
         # insert new head into snake's body once moved 
-        self.snake_body.insert(0, self.snake_head)
+        self.push_head(self.snake_head)
 
         # check for collisions or frame iterations
-        if self.check_collision() or self.nframes > 100 * len(self.snake_body):
+        collided = self.check_collision()
+        if collided or self.nframes > 100 * len(self.snake_body):
             self.game_over = True
+            self.death = "collision" if collided else "timeout"
             reward = -10 
             return reward, self.game_over
 
@@ -134,16 +201,65 @@ class SnakeGameAgent:
             reward = 30
             self.place_food_randomly()
         else:
-            self.snake_body.pop() # just a normal turn and no food consumed
+            self.pop_tail() # just a normal turn and no food consumed
         
         # once all checks are done, update ui to reflect move
-        self.update_ui()
-        self.clock.tick(SPEED)
+        if rendering:
+            start = self.timers.now()
+            self.update_ui()
+            start = self.timers.add("update_ui", start)
+            if self.render_mode == "human":
+                self.clock.tick(SPEED)
+                self.timers.add("clock_tick", start)
 
         return reward, self.game_over
 
 
 
+    # decide if this frame gets drawn
+    def should_render(self):
+        if self.render_mode == "human":
+            return True
+        if self.render_mode == "every_k":
+            return self.nframes % self.render_every == 0
+        return False
+
+    # index of the grid cell under a point
+    def cell(self, point):
+        return (int(point.y) // BLOCK) * self.cols + int(point.x) // BLOCK
+
+    def is_outside(self, point):
+        return point.x > self.w - BLOCK or point.x < 0 or point.y  < 0 or point.y > self.h - BLOCK
+
+    # add a new head to the body, a head outside the board is not on the grid
+    def push_head(self, point):
+        self.snake_body.appendleft(point)
+        if self.renderer is not None:
+            self.renderer.mark(point)
+        if not self.is_outside(point):
+            cell = self.cell(point)
+            if self.grid[cell] == 0:
+                self.free_cells.remove(cell)
+                if self.regions is not None:
+                    self.regions.occupy(cell)
+            self.grid[cell] += 1
+
+    def pop_tail(self):
+        tail = self.snake_body.pop()
+        if self.renderer is not None:
+            self.renderer.mark(tail)
+        cell = self.cell(tail)
+        self.grid[cell] -= 1
+        if self.grid[cell] == 0:
+            self.free_cells.add(cell)
+            if self.regions is not None:
+                self.regions.release(cell)
+
+    # keep labels for the regions of free cells from now on, see regions.py
+    # only games that use the reachable-space features pay for them
+    def track_regions(self):
+        self.regions = RegionTracker.from_grid(self.rows, self.cols, self.grid)
+
     def move_snake(self):
         x,y = self.snake_head.x, self.snake_head.y
         if self.snake_direction == Direction.LEFT:
@@ -161,23 +277,34 @@ class SnakeGameAgent:
         
 
     def check_collision(self, point = None):
+        # only a collision of the actual head ends the game,
+        # checking a neighbouring point for danger must not
+        is_head = point is None
         if point is None:
             point = self.snake_head
         # check collision using self.snake_head
-        if point.x > self.w - BLOCK or point.x < 0 or point.y  < 0 or point.y > self.h - BLOCK:
-            self.game_over = True
+        if self.is_outside(point):
+            if is_head:
+                self.game_over = True
             return True
         
         # check if snake collided with itself 
-        if point in self.snake_body[1:]: # first point in body is head
-            self.game_over = True
+        # the head is already on the grid, so it only collides if some other part is there too
+        if self.grid[self.cell(point)] > (1 if is_head else 0):
+            if is_head:
+                self.game_over = True
             return True
         return False
     
 
 
 
+    # only the cells that changed are drawn, see renderer.py
     def update_ui(self):
+        self.renderer.render(self)
+
+    # draw the whole board, the renderer adds the score and flips the screen
+    def draw_full(self):
         self.display.fill(BLACK) # fill display with black
         # draw every point of the snake
         for part in self.snake_body:
@@ -187,14 +314,21 @@ class SnakeGameAgent:
         # draw food
         pygame.draw.rect(self.display, RED, pygame.Rect(self.food.x, self.food.y, BLOCK, BLOCK))
 
-        # write score near the top left 
-        score_text = font.render(f"Score: {self.score}", True, BLUE1)
-        self.display.blit(score_text, [10, 10])
-        # flip the screen to reflect changes
-        pygame.display.flip()
+    # draw whatever is on the cell at x, y now and return its rect
+    def draw_cell(self, x, y):
+        rect = pygame.Rect(x, y, BLOCK, BLOCK)
+        if self.grid[self.cell(Point(x, y))]:
+            pygame.draw.rect(self.display, PINK, rect)
+            pygame.draw.rect(self.display, HOT_PINK, pygame.Rect(x+4, y+4, 12, 12))
+        elif x == self.food.x and y == self.food.y:
+            pygame.draw.rect(self.display, RED, rect)
+        else:
+            pygame.draw.rect(self.display, BLACK, rect)
+        return rect
     
     def end_game(self):
         if self.game_over == True:
-            pygame.quit()
+            if pygame is not None:
+                pygame.quit()
             quit()
                     
@@ -0,0 +1,68 @@
+# timers for the phases of the training loop
+# usage: t = timers.now(), do the work, t = timers.add("phase", t)
+# add() returns the current time so phases can be chained without calling now() again.
+# NullTimers has the same methods doing nothing, so with timing off the loop
+# only pays for a couple of empty method calls per frame
+import time
+import json
+from collections import defaultdict
+
+class Timers:
+    def __init__(self):
+        self.totals = defaultdict(float) # seconds spent in each phase
+        self.counts = defaultdict(int) # how many times each phase ran
+
+    def now(self):
+        return time.perf_counter()
+
+    # charge the time since start to name, returns the current time
+    def add(self, name, start):
+        end = time.perf_counter()
+        self.totals[name] += end - start
+        self.counts[name] += 1
+        return end
+
+    # seconds per phase, largest first
+    def summary(self):
+        return {name: round(total, 6) for name, total in sorted(self.totals.items(), key=lambda kv: -kv[1])}
+
+class NullTimers:
+    def now(self):
+        return 0.0
+
+    def add(self, name, start):
+        return 0.0
+
+    def summary(self):
+        return None
+
+# keeps the numbers between two reports so rates are per interval
+class MetricsLogger:
+    # agent: count from its frames and updates so far, e.g. after a resume
+    def __init__(self, timers, out=None, agent=None):
+        self.timers = timers
+        self.out = out # file to write to, stdout when None
+        self.last_time = time.perf_counter()
+        self.last_steps = 0 if agent is None else agent.n_steps
+        self.last_updates = 0 if agent is None else agent.trainer.n_updates
+
+    # write one json line
+    def emit(self, agent, score, record):
+        now = time.perf_counter()
+        elapsed = max(now - self.last_time, 1e-9)
+        updates = agent.trainer.n_updates
+        line = {
+            "game": agent.n_games,
+            "score": score,
+            "record": record,
+            "frames": agent.n_steps,
+            "fps": round((agent.n_steps - self.last_steps) / elapsed, 1),
+            "updates": updates,
+            "updates_per_sec": round((updates - self.last_updates) / elapsed, 1),
+            "replay_size": len(agent.memory),
+        }
+        phases = self.timers.summary()
+        if phases is not None:
+            line["phases"] = phases
+        print(json.dumps(line), file=self.out, flush=True)
+        self.last_time, self.last_steps, self.last_updates = now, agent.n_steps, updates
@@ -0,0 +1,201 @@
+# watch a headless training run from another process
+# the trainer copies the game it is playing into a small shared memory
+# block: the body cells (head first), the food cell, the score and the game
+# number. a viewer process maps the same block and draws it with pygame at
+# its own frame rate, so the trainer never waits on a window or a clock.
+# the viewer writes a heartbeat into the block on every frame it draws. the
+# trainer only copies the game while that heartbeat is recent, so with no
+# viewer attached publishing is a counter and one clock read, and a viewer
+# can come and go at any time.
+# a write is wrapped in a sequence number (odd while writing) and the reader
+# copies until it sees the same even number before and after, so it never
+# draws half a frame and the trainer never takes a lock.
+# the block also holds the trainer's pid, so a second run started with the
+# same name fails instead of taking over a block that is still in use.
+# usage:
+#   python cli.py train --render none --live
+#   python cli.py view --fps 30
+import os
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+DEFAULT_NAME = "snake_live"
+
+# int64 header fields, OWNER is the pid of the publishing process
+SEQ, GAME, SCORE, FOOD, LENGTH, ROWS, COLS, HEARTBEAT, CLOSED, OWNER = range(10)
+HEADER_FIELDS = 10
+HEADER_BYTES = HEADER_FIELDS * 8
+
+# a viewer counts as attached while its last heartbeat is this recent
+HEARTBEAT_TIMEOUT_NS = 1_000_000_000
+
+class LivePublisher:
+    # every: publish one frame in every that many calls to publish()
+    def __init__(self, rows, cols, name=DEFAULT_NAME, every=1):
+        self.every = max(1, every)
+        self.count = 0
+        size = HEADER_BYTES + rows * cols * 4
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            remove_stale(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        self.body = np.ndarray((rows * cols,), dtype=np.int32, buffer=self.shm.buf, offset=HEADER_BYTES)
+        self.header[:] = 0
+        self.header[OWNER] = os.getpid()
+        self.header[ROWS] = rows
+        self.header[COLS] = cols
+
+    def viewer_attached(self):
+        return time.monotonic_ns() - self.header[HEARTBEAT] < HEARTBEAT_TIMEOUT_NS
+
+    # call once per frame, cheap when it is not this frame's turn or nobody watches
+    def publish(self, game, n_games):
+        self.count += 1
+        if self.count < self.every:
+            return
+        self.count = 0
+        if not self.viewer_attached():
+            return
+        cells = [game.cell(part) for part in game.snake_body if not game.is_outside(part)]
+        header = self.header
+        header[SEQ] += 1 # odd: a write is in progress
+        self.body[:len(cells)] = cells
+        header[LENGTH] = len(cells)
+        header[FOOD] = -1 if game.food is None else game.cell(game.food)
+        header[SCORE] = game.score
+        header[GAME] = n_games
+        header[SEQ] += 1
+
+    def close(self):
+        self.header[CLOSED] = 1
+        # the arrays point into the block and have to go before it can be closed
+        del self.header, self.body
+        self.shm.close()
+        self.shm.unlink()
+
+def process_alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # there is a process, it just is not ours
+    return True
+
+# unlink a block with this name that no running trainer publishes in any
+# more (closed, or its owner was killed before it could close it).
+# a block another trainer is still publishing in is an error, taking it over
+# would freeze that run's viewers and its close() would unlink this one
+def remove_stale(name):
+    reader = LiveReader(name)
+    closed, owner = reader.closed(), int(reader.header[OWNER])
+    reader.close()
+    if not closed and process_alive(owner):
+        raise FileExistsError(f"training run {owner} is already publishing as {name!r}, "
+                              "pick another name with --live NAME")
+    stale = shared_memory.SharedMemory(name=name)
+    stale.unlink()
+    stale.close()
+
+class LiveReader:
+    def __init__(self, name=DEFAULT_NAME):
+        # python's resource tracker would unlink a block this process only
+        # attached to when it exits, taking it away from the trainer.
+        # track=False says so from python 3.13 on, before that it has to be unregistered
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            self.shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        self.rows = int(self.header[ROWS])
+        self.cols = int(self.header[COLS])
+        self.body = np.ndarray((self.rows * self.cols,), dtype=np.int32, buffer=self.shm.buf, offset=HEADER_BYTES)
+
+    def closed(self):
+        return bool(self.header[CLOSED])
+
+    def heartbeat(self):
+        self.header[HEARTBEAT] = time.monotonic_ns()
+
+    # a consistent copy of the last published frame as (game, score, food, body cells),
+    # None if nothing was published yet or no clean copy could be made
+    # (a trainer killed in the middle of a write leaves the sequence odd)
+    def snapshot(self, tries=100):
+        header = self.header
+        for _ in range(tries):
+            seq = int(header[SEQ])
+            if seq == 0:
+                return None
+            if seq % 2:
+                continue
+            length = int(header[LENGTH])
+            frame = (int(header[GAME]), int(header[SCORE]), int(header[FOOD]), self.body[:length].copy())
+            if int(header[SEQ]) == seq:
+                return frame
+        return None
+
+    def close(self):
+        del self.header, self.body
+        self.shm.close()
+
+# attach to the block called name whenever it exists and draw it fps times a second
+# runs until the window is closed
+def view(name=DEFAULT_NAME, fps=30):
+    import pygame
+    from game_agent import BLOCK, BLACK, PINK, HOT_PINK, RED, BLUE1
+    pygame.init()
+    font = pygame.font.SysFont('Arial', 20)
+    display = pygame.display.set_mode((640, 480))
+    pygame.display.set_caption("SNAKE LIVE")
+    clock = pygame.time.Clock()
+    reader = None
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                if reader is not None:
+                    reader.close()
+                pygame.quit()
+                return
+
+        # (re)attach while there is no trainer publishing
+        if reader is not None and reader.closed():
+            reader.close()
+            reader = None
+        if reader is None:
+            try:
+                reader = LiveReader(name)
+            except FileNotFoundError:
+                display.fill(BLACK)
+                display.blit(font.render("waiting for a training run...", True, BLUE1), [10, 10])
+                pygame.display.flip()
+                clock.tick(2)
+                continue
+            if reader.rows == 0:
+                # caught the trainer between creating the block and filling in its size
+                reader.close()
+                reader = None
+                continue
+            if display.get_size() != (reader.cols * BLOCK, reader.rows * BLOCK):
+                display = pygame.display.set_mode((reader.cols * BLOCK, reader.rows * BLOCK))
+
+        reader.heartbeat()
+        frame = reader.snapshot()
+        display.fill(BLACK)
+        if frame is not None:
+            game, score, food, body = frame
+            for cell in body:
+                x, y = (cell % reader.cols) * BLOCK, (cell // reader.cols) * BLOCK
+                pygame.draw.rect(display, PINK, pygame.Rect(x, y, BLOCK, BLOCK))
+                pygame.draw.rect(display, HOT_PINK, pygame.Rect(x+4, y+4, 12, 12))
+            if food >= 0:
+                x, y = (food % reader.cols) * BLOCK, (food // reader.cols) * BLOCK
+                pygame.draw.rect(display, RED, pygame.Rect(x, y, BLOCK, BLOCK))
+            display.blit(font.render(f"Game: {game}  Score: {score}", True, BLUE1), [10, 10])
+        pygame.display.flip()
+        clock.tick(fps)
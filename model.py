@@ -3,6 +3,7 @@ import torch.nn as nn
 import torch.optim as optim
 import random 
 import torch.nn.functional as F
+from numpy_policy import NumpyPolicy
 
 class QNet(nn.Module):
     def __init__(self, input_size,hidden_size,output_size):
@@ -17,4 +18,6 @@ class QNet(nn.Module):
         x = self.fc3(x)  # no activation in the final layer since we need raw Q-values
         return x
 
-
+    # snapshot the weights into a torch-free NumpyPolicy for fast single-state inference
+    def to_numpy(self):
+        return NumpyPolicy.from_state_dict(self.state_dict())
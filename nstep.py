@@ -0,0 +1,56 @@
+# n-step returns, built as the game is played
+# instead of (s, a, r, s') the memory gets (s_t, a_t, G, s_t+n, done) with
+# G = r_t + gamma * r_t+1 + ... + gamma^(n-1) * r_t+n-1, and the trainer
+# bootstraps with gamma^n * max Q(s_t+n). the +30 for food then travels back
+# n frames in one update instead of one.
+# the window holds the last n frames of one game and the discounted sum of
+# their rewards. a new frame adds gamma^k * r to the sum and dropping the
+# oldest takes its reward off and divides by gamma, so every frame costs the
+# same whatever n is. the division lets rounding errors grow by 1 / gamma per
+# frame, so the sum is recomputed from the window once every n frames.
+# when the game ends everything still in the window is emitted with done set,
+# those transitions never bootstrap so their shorter horizon does not matter
+from collections import deque
+
+class NStepWindow:
+    def __init__(self, n, gamma):
+        if n < 1:
+            raise ValueError(f"n must be at least 1, got {n}")
+        self.n = n
+        self.gamma = gamma
+        self.discounts = [gamma ** i for i in range(n)]
+        self.window = deque() # (state, action, reward) of the frames not emitted yet
+        self.ret = 0.0 # discounted sum of the window's rewards, seen from its oldest frame
+        self.dropped = 0
+
+    # add one frame of the game, returns the n-step transitions it completes
+    # as (state, action, return, state n frames later, done) tuples
+    def push(self, state, action, reward, next_state, done):
+        self.window.append((state, action, reward))
+        self.ret += self.discounts[len(self.window) - 1] * reward
+        if done:
+            out = []
+            while self.window:
+                out.append(self.pop(next_state, True))
+            return out
+        if len(self.window) == self.n:
+            return [self.pop(next_state, False)]
+        return []
+
+    # emit the oldest frame and take it out of the running sum
+    def pop(self, next_state, done):
+        state, action, reward = self.window.popleft()
+        out = (state, action, self.ret, next_state, done)
+        self.dropped += 1
+        if not self.window:
+            self.ret = 0.0
+        elif self.gamma == 0 or self.dropped % self.n == 0:
+            self.ret = sum(d * r for d, (_, _, r) in zip(self.discounts, self.window))
+        else:
+            self.ret = (self.ret - reward) / self.gamma
+        return out
+
+    # forget a game that was left before it ended
+    def clear(self):
+        self.window.clear()
+        self.ret = 0.0
@@ -0,0 +1,58 @@
+# the QNet forward pass in plain numpy
+# QNet is only 11 -> 256 -> 3, so for a single state most of the time in a
+# torch call goes to dispatch overhead rather than the math. this class keeps
+# a copy of fc1 / fc3 as contiguous float32 arrays and computes
+# relu(x @ W1 + b1) @ W2 + b2 itself. nothing here imports torch, so a
+# process that only needs to play (an actor, an evaluation worker) can load
+# the weights from an .npz file and never pay for importing torch
+import numpy as np
+
+class NumpyPolicy:
+    def __init__(self, w1, b1, w2, b2):
+        # w1 is (inputs, hidden) and w2 is (hidden, outputs), the transpose of nn.Linear's weights
+        self.w1 = np.ascontiguousarray(w1, dtype=np.float32)
+        self.b1 = np.ascontiguousarray(b1, dtype=np.float32)
+        self.w2 = np.ascontiguousarray(w2, dtype=np.float32)
+        self.b2 = np.ascontiguousarray(b2, dtype=np.float32)
+        self.n_features = self.w1.shape[0]
+
+    # snapshot a QNet state dict, tensors are turned into numpy through their own methods
+    @classmethod
+    def from_state_dict(cls, state):
+        return cls(
+            state["fc1.weight"].detach().cpu().numpy().T,
+            state["fc1.bias"].detach().cpu().numpy(),
+            state["fc3.weight"].detach().cpu().numpy().T,
+            state["fc3.bias"].detach().cpu().numpy(),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f["w1"], f["b1"], f["w2"], f["b2"])
+
+    def save(self, path):
+        np.savez(path, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+
+    # copy the model's current weights into the existing arrays
+    # meant to be called after trainer updates, see QTrainer.update_hooks
+    def refresh(self, model):
+        state = model.state_dict()
+        np.copyto(self.w1, state["fc1.weight"].detach().cpu().numpy().T)
+        np.copyto(self.b1, state["fc1.bias"].detach().cpu().numpy())
+        np.copyto(self.w2, state["fc3.weight"].detach().cpu().numpy().T)
+        np.copyto(self.b2, state["fc3.bias"].detach().cpu().numpy())
+
+    # q values for one (11,) state or a (n, 11) batch
+    def q_values(self, states):
+        x = np.asarray(states, dtype=np.float32)
+        hidden = x @ self.w1
+        hidden += self.b1
+        np.maximum(hidden, 0, out=hidden)
+        out = hidden @ self.w2
+        out += self.b2
+        return out
+
+    # index of the best action for one state, or an array of them for a batch
+    def act(self, states):
+        return np.argmax(self.q_values(states), axis=-1)
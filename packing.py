@@ -0,0 +1,36 @@
+# every feature of a state is 0 or 1, so a whole state fits in the bits of
+# one uint16: feature i is bit i. the action index (0-2) and the done flag
+# share one byte as action | done << 2.
+# unpacking is a lookup in a table with one float32 row per possible code
+# (2048 x 11 for the agent's 11 features, 90 KB), so a sampled batch of codes
+# turns into the float batch the trainer wants with a single row gather
+import numpy as np
+
+MAX_STATE_BITS = 16
+BIT_VALUES = 1 << np.arange(MAX_STATE_BITS)
+
+# codes for a (n, k) batch of 0 / 1 states, or a single code for one (k,) state
+def pack_states(states):
+    states = np.asarray(states)
+    return states.dot(BIT_VALUES[:states.shape[-1]]).astype(np.uint16)
+
+# float32 rows for every code of k bits, built once per k
+tables = {}
+
+def unpack_table(k):
+    if k not in tables:
+        codes = np.arange(1 << k)
+        tables[k] = ((codes[:, None] >> np.arange(k)) & 1).astype(np.float32)
+    return tables[k]
+
+# (n, k) float32 states for n codes
+# np.take along the rows is a few times faster than fancy indexing here
+def unpack_states(codes, k):
+    return np.take(unpack_table(k), codes, axis=0)
+
+def pack_codes(actions, dones):
+    return (np.asarray(actions).astype(np.uint8) | (np.asarray(dones).astype(np.uint8) << 2)).astype(np.uint8)
+
+# (actions, dones) as int64 indices and booleans, the dtypes the trainer uses
+def unpack_codes(codes):
+    return (codes & 3).astype(np.int64), (codes & 4) != 0
@@ -0,0 +1,116 @@
+# prioritized experience replay
+# experiences are sampled in proportion to their last td error instead of
+# uniformly, so the rare food and death steps get replayed more often.
+# priorities live in a sum tree so insert, update and sampling are O(log n)
+import numpy as np
+from replay_buffer import ReplayBuffer
+
+# binary tree where every node holds the sum of its two children
+# leaves hold the priorities, the root holds the total
+class SumTree:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # round the leaves up to a power of two so every level is full
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.depth = self.leaves.bit_length() - 1
+        # node 1 is the root, node 0 is unused
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    # set one priority, walking up to the root
+    def set(self, i, priority):
+        node = self.leaves + i
+        self.tree[node] = priority
+        node //= 2
+        while node >= 1:
+            self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+            node //= 2
+
+    # set many priorities at once, one vectorized pass per level
+    # parents are recomputed from their children so repeated indices are fine
+    def update(self, idx, priorities):
+        nodes = self.leaves + np.asarray(idx)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def get(self, idx):
+        return self.tree[self.leaves + np.asarray(idx)]
+
+    # find the leaf for each value in [0, total), walking all values down together
+    def find(self, values):
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values >= left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    # alpha: how much the priorities matter, 0 is uniform
+    # beta: importance sampling correction, grows to 1 over beta_steps samples
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, beta_steps=100_000, eps=1e-3, seed=None, path=None,
+                 packed=False, resume=False):
+        super().__init__(capacity, state_size, seed=seed, path=path, packed=packed, resume=resume)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = (1.0 - beta) / beta_steps
+        self.eps = eps
+        self.priorities = SumTree(capacity)
+        self.max_priority = 1.0
+
+    # new experiences get the highest priority seen so far so they are replayed at least once
+    def append(self, state, action, reward, next_state, done):
+        i = super().append(state, action, reward, next_state, done)
+        self.priorities.set(i, self.max_priority)
+        return i
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        idx = super().extend(states, actions, rewards, next_states, dones)
+        self.priorities.update(idx, np.full(len(idx), self.max_priority))
+        return idx
+
+    # the tree is not saved, a resumed memory starts with every experience at max priority
+    def state_dict(self):
+        state = super().state_dict()
+        state["beta"] = self.beta
+        state["max_priority"] = self.max_priority
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.beta = state["beta"]
+        self.max_priority = state["max_priority"]
+        self.priorities.update(np.arange(self.size), np.full(self.size, self.max_priority))
+
+    # stratified proportional sampling, one value from each of batch_size equal segments
+    def sample_indices(self, batch_size):
+        if self.size <= batch_size:
+            return np.arange(self.size)
+        segment = self.priorities.total() / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        idx = self.priorities.find(values)
+        # rounding can walk past the last filled slot
+        return np.minimum(idx, self.size - 1)
+
+    # importance sampling weights for the sampled slots, scaled so the largest is 1
+    def get_weights(self, idx):
+        probs = self.priorities.get(idx) / self.priorities.total()
+        weights = (self.size * probs) ** (-self.beta)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return (weights / weights.max()).astype(np.float32)
+
+    # feed the td errors from the trainer back in as new priorities
+    def update_priorities(self, idx, td_errors):
+        priorities = (np.abs(td_errors) + self.eps) ** self.alpha
+        self.priorities.update(idx, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
@@ -0,0 +1,67 @@
+# a table of the model's q values for every possible state
+# the agent's state is 11 binary features, so there are only 2048 of them.
+# one batched forward pass over all of them gives a (2048, 3) table, and
+# picking a move or the max q value of a next state becomes an array lookup
+# on the state's bit code (see packing.py) instead of a forward pass.
+# the trainer calls mark_stale() after every optimizer step (it sits in
+# QTrainer.update_hooks) and the table is rebuilt lazily, on the first lookup
+# once refresh_every updates have gone by. refresh_every=1 always answers
+# with the live model, a larger value saves forward passes and makes the
+# bootstrap targets come from weights up to refresh_every updates old, the
+# same as a target network synced every refresh_every updates
+import numpy as np
+import torch
+from packing import pack_states, unpack_table
+
+class QCache:
+    def __init__(self, model, n_features=11, refresh_every=1):
+        self.model = model
+        self.refresh_every = refresh_every
+        self.all_states = torch.from_numpy(unpack_table(n_features)) # row i is the state with code i
+        self.table = None # built on the first lookup
+        self.max_table = None
+        self.stale_updates = 0 # optimizer steps since the table was built
+        self.n_refreshes = 0
+
+    # called after every optimizer step
+    def mark_stale(self):
+        self.stale_updates += 1
+
+    # build the table again on the next lookup whatever refresh_every says,
+    # e.g. after new weights were loaded into the model
+    def invalidate(self):
+        self.table = None
+
+    def refresh(self):
+        with torch.inference_mode():
+            self.table = self.model(self.all_states).numpy()
+        self.max_table = self.table.max(axis=1)
+        self.stale_updates = 0
+        self.n_refreshes += 1
+
+    def check_refresh(self):
+        if self.table is None or self.stale_updates >= self.refresh_every:
+            self.refresh()
+
+    # q values for one (11,) state or a (n, 11) batch of 0 / 1 states
+    def q_values(self, states):
+        self.check_refresh()
+        return self.table[pack_states(states)]
+
+    # index of the best action for one state, or an array of them for a batch
+    def act(self, states):
+        return np.argmax(self.q_values(states), axis=-1)
+
+    # max q value of every state in a batch, for the bootstrap targets
+    def max_q(self, states):
+        self.check_refresh()
+        return self.max_table[pack_states(states)]
+
+    # how far the table is from the live model: the optimizer steps since it
+    # was built and the largest difference over all 2048 states
+    def staleness(self):
+        if self.table is None:
+            return {"updates": self.stale_updates, "max_error": None}
+        with torch.inference_mode():
+            live = self.model(self.all_states).numpy()
+        return {"updates": self.stale_updates, "max_error": float(np.abs(live - self.table).max())}
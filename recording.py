@@ -0,0 +1,163 @@
+# compact episode logs, so any game can be looked at again after the fact
+# a game is fully decided by the board size, the seed its random generator
+# was reset with and the moves that were played, so that is all that is
+# kept: every move takes 2 bits (0 straight, 1 left, 2 right, the index into
+# POSSIBLE) and each episode starts on a new byte of actions.bin. index.bin
+# has one fixed-size record per episode with where its moves start, how many
+# there are, its seed, board size, score and how it ended.
+# both files are only ever appended to. the reader maps them with np.memmap,
+# so jumping to episode i is one lookup in the index, however long the log.
+# usage:
+#   recorder = EpisodeRecorder("episodes/")
+#   game.reset(seed=recorder.begin(game)); recorder.record(move) every step
+#   recorder.end(game) when it is over
+#   python cli.py replay episodes/ --episode 12 --render --fps 30
+import os
+import time
+import random
+import numpy as np
+from game_agent import SnakeGameAgent
+from features import POSSIBLE
+
+ACTIONS_FILE = "actions.bin"
+INDEX_FILE = "index.bin"
+
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"), # byte offset of the first move in actions.bin
+    ("steps", "<u4"),
+    ("seed", "<u4"),
+    ("h", "<u2"),
+    ("w", "<u2"),
+    ("score", "<u2"),
+    ("death", "u1"), # index into DEATHS
+])
+
+# game.death values, None is a game that was closed before it ended
+DEATHS = ["collision", "timeout", "board_full", None]
+
+# pack action indices 4 to a byte, the first move in the lowest 2 bits
+def pack_actions(actions):
+    actions = np.asarray(actions, dtype=np.uint8)
+    padded = np.zeros((len(actions) + 3) // 4 * 4, dtype=np.uint8)
+    padded[:len(actions)] = actions
+    quads = padded.reshape(-1, 4)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+def unpack_actions(packed, steps):
+    packed = np.asarray(packed, dtype=np.uint8)
+    quads = np.stack([packed & 3, (packed >> 2) & 3, (packed >> 4) & 3, packed >> 6], axis=1)
+    return quads.reshape(-1)[:steps]
+
+class EpisodeRecorder:
+    # appends to the log in path, or starts one
+    # seed: seeds the generator the episode seeds are drawn from
+    def __init__(self, path, seed=None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.seeds = random.Random(seed)
+        self.actions_file = open(os.path.join(path, ACTIONS_FILE), "ab")
+        self.index_file = open(os.path.join(path, INDEX_FILE), "ab")
+        # drop a half written index record left by a crash
+        size = self.index_file.tell()
+        if size % INDEX_DTYPE.itemsize:
+            self.index_file.truncate(size - size % INDEX_DTYPE.itemsize)
+        self.n_episodes = self.index_file.tell() // INDEX_DTYPE.itemsize
+        self.offset = self.actions_file.tell()
+        self.moves = bytearray() # moves of the current episode, one byte each until it ends
+        self.seed = None
+        self.board = None
+
+    # start an episode and return the seed the game has to be reset with
+    def begin(self, game):
+        self.seed = self.seeds.getrandbits(32)
+        self.board = (game.h, game.w)
+        self.moves.clear()
+        return self.seed
+
+    # one move, as the [1,0,0] style list or its index into POSSIBLE
+    def record(self, move):
+        self.moves.append(move.index(1) if isinstance(move, list) else int(move))
+
+    # write the finished episode, the moves first so the index never points past them
+    def end(self, game):
+        packed = pack_actions(np.frombuffer(self.moves, dtype=np.uint8))
+        entry = np.zeros(1, dtype=INDEX_DTYPE)
+        entry["offset"] = self.offset
+        entry["steps"] = len(self.moves)
+        entry["seed"] = self.seed
+        entry["h"], entry["w"] = self.board
+        entry["score"] = game.score
+        entry["death"] = DEATHS.index(game.death)
+        self.actions_file.write(packed.tobytes())
+        self.index_file.write(entry.tobytes())
+        # one flush per episode keeps the log readable while training runs
+        self.actions_file.flush()
+        self.index_file.flush()
+        self.offset += len(packed)
+        self.n_episodes += 1
+        self.moves.clear()
+
+    def close(self):
+        self.actions_file.close()
+        self.index_file.close()
+
+class EpisodeLog:
+    def __init__(self, path):
+        self.path = path
+        self.refresh()
+
+    # map the files again to see episodes written since the log was opened
+    def refresh(self):
+        actions_path = os.path.join(self.path, ACTIONS_FILE)
+        index_path = os.path.join(self.path, INDEX_FILE)
+        n = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", shape=(n,)) if n else np.zeros(0, dtype=INDEX_DTYPE)
+        size = os.path.getsize(actions_path)
+        self.actions = np.memmap(actions_path, dtype=np.uint8, mode="r") if size else np.zeros(0, dtype=np.uint8)
+        # an index record whose moves were not flushed yet does not count
+        ends = self.index["offset"] + (self.index["steps"].astype(np.uint64) + 3) // 4
+        self.n_episodes = int(np.searchsorted(ends, size, side="right"))
+
+    def __len__(self):
+        return self.n_episodes
+
+    def __getitem__(self, i):
+        return self.index[i]
+
+    # the moves of episode i as indices into POSSIBLE
+    def moves(self, i):
+        entry = self.index[i]
+        start = int(entry["offset"])
+        steps = int(entry["steps"])
+        return unpack_actions(self.actions[start:start + (steps + 3) // 4], steps)
+
+    # scores, lengths and deaths of every episode, straight from the index
+    def summary(self):
+        index = self.index[:self.n_episodes]
+        return {
+            "episodes": self.n_episodes,
+            "steps": int(index["steps"].sum()),
+            "bytes": int(self.actions.size + self.index.nbytes),
+            "best": int(np.argmax(index["score"])) if self.n_episodes else None,
+            "max_score": int(index["score"].max()) if self.n_episodes else None,
+            "mean_score": round(float(index["score"].mean()), 4) if self.n_episodes else None,
+            "deaths": {str(DEATHS[d]): int(c) for d, c in enumerate(np.bincount(index["death"], minlength=len(DEATHS))) if c},
+        }
+
+# play episode i of the log again through SnakeGameAgent
+# render: draw it, fps: frames per second when drawing, None is as fast as possible
+# returns the game, its score has to match the one in the index
+def replay(log, i, render=False, fps=None):
+    entry = log[i]
+    game = SnakeGameAgent(h=int(entry["h"]), w=int(entry["w"]),
+                          render_mode="every_k" if render else "none", seed=int(entry["seed"]))
+    delay = 1 / fps if render and fps else 0
+    next_frame = time.perf_counter()
+    for move in log.moves(i):
+        _, done = game.make_a_step(POSSIBLE[move])
+        if delay:
+            next_frame += delay
+            time.sleep(max(0, next_frame - time.perf_counter()))
+        if done:
+            break
+    return game
@@ -0,0 +1,196 @@
+# labels for the connected regions of free cells, kept up to date as the
+# snake moves so the size of the region around any cell is a lookup
+# every free cell has the label of its region and sizes maps a label to its
+# cell count. a step changes at most two cells:
+# - the new head takes a free cell. its region can only split if the free
+#   cells next to it are not already joined around it, which the 8 cells
+#   around it tell in O(1). only then one search per side runs, all of them
+#   a cell at a time, until every side but one is used up or they meet.
+#   the sides that got used up get new labels, so the work is about the size
+#   of the smaller sides, not of the board.
+# - the old tail frees a cell. it joins the regions next to it, the smaller
+#   ones are relabelled into the largest.
+# a region is only walked when it is cut off or joined, which is rare, and
+# then only the smaller part is, so a step stays cheap on big boards and
+# with long snakes.
+from collections import deque
+
+class RegionTracker:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.n = rows * cols
+        # the 4 neighbours of every cell and its 8 surrounding cells in ring
+        # order (n, ne, e, se, s, sw, w, nw), -1 outside the board
+        self.neighbours = []
+        self.rings = []
+        offsets = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+        for cell in range(self.n):
+            r, c = divmod(cell, cols)
+            ring = tuple((r + dr) * cols + c + dc if 0 <= r + dr < rows and 0 <= c + dc < cols else -1
+                         for dr, dc in offsets)
+            self.rings.append(ring)
+            self.neighbours.append(tuple(x for x in ring[::2] if x >= 0))
+        self.reset()
+
+    # an empty board, one region
+    def reset(self):
+        self.label = [0] * self.n # -1 for a taken cell
+        self.sizes = {0: self.n}
+        self.next_label = 1
+
+    # labels for a board that is already in play, grid counts what is on each cell
+    @classmethod
+    def from_grid(cls, rows, cols, grid):
+        tracker = cls(rows, cols)
+        tracker.label = [-1 if grid[cell] else None for cell in range(tracker.n)]
+        tracker.sizes = {}
+        tracker.next_label = 0
+        for cell in range(tracker.n):
+            if tracker.label[cell] is None:
+                new = tracker.new_label()
+                tracker.label[cell] = new
+                tracker.sizes[new] = tracker.fill(cell, None, new)
+        return tracker
+
+    def new_label(self):
+        self.next_label += 1
+        return self.next_label - 1
+
+    # give every cell reachable from start whose label is old the label new,
+    # returns how many there were
+    def fill(self, start, old, new):
+        label = self.label
+        neighbours = self.neighbours
+        label[start] = new
+        queue = deque([start])
+        count = 1
+        while queue:
+            cell = queue.popleft()
+            for nb in neighbours[cell]:
+                if label[nb] == old:
+                    label[nb] = new
+                    queue.append(nb)
+                    count += 1
+        return count
+
+    # cells in the region around cell, 0 if it is taken
+    def size_at(self, cell):
+        label = self.label[cell]
+        return self.sizes[label] if label >= 0 else 0
+
+    # cell was free and now is not
+    def occupy(self, cell):
+        label = self.label
+        old = label[cell]
+        label[cell] = -1
+        self.sizes[old] -= 1
+        if self.sizes[old] == 0:
+            del self.sizes[old]
+            return
+
+        # walk the ring around the cell: free runs are joined around it, so
+        # only runs that hold one of its 4 neighbours and are separated by
+        # taken cells can end up in different regions
+        ring = self.rings[cell]
+        free = [x >= 0 and label[x] >= 0 for x in ring]
+        if all(free):
+            return
+        blocked = free.index(False)
+        starts = []
+        start = None
+        for j in range(1, 9):
+            p = (blocked + j) % 8
+            if free[p]:
+                if start is None and p % 2 == 0:
+                    start = ring[p]
+            elif start is not None:
+                starts.append(start)
+                start = None
+        if len(starts) > 1:
+            self.split(starts, old)
+
+    # one search per possible side, a cell each in turn, searches that meet are
+    # the same side. stops once at most one side is still growing and gives the
+    # finished sides new labels
+    def split(self, starts, old):
+        label = self.label
+        neighbours = self.neighbours
+        k = len(starts)
+        group = list(range(k)) # which side each search belongs to, merged when they meet
+        owner = {}
+        queues = []
+        visited = []
+        for i, s in enumerate(starts):
+            owner[s] = i
+            queues.append(deque([s]))
+            visited.append([s])
+
+        def find(i):
+            while group[i] != i:
+                i = group[i]
+            return i
+
+        while True:
+            growing = {find(i) for i in range(k) if queues[i]}
+            if len(growing) <= 1:
+                break
+            for i in range(k):
+                if not queues[i]:
+                    continue
+                cell = queues[i].popleft()
+                for nb in neighbours[cell]:
+                    if label[nb] != old:
+                        continue
+                    o = owner.get(nb)
+                    if o is None:
+                        owner[nb] = i
+                        queues[i].append(nb)
+                        visited[i].append(nb)
+                    else:
+                        a, b = find(o), find(i)
+                        if a != b:
+                            group[max(a, b)] = min(a, b)
+
+        sides = {}
+        for i in range(k):
+            sides.setdefault(find(i), []).append(i)
+        if len(sides) == 1:
+            return
+        # the side still growing keeps the old label, if none is the largest one does
+        growing = {find(i) for i in range(k) if queues[i]}
+        if growing:
+            keep = growing.pop()
+        else:
+            keep = max(sides, key=lambda side: sum(len(visited[i]) for i in sides[side]))
+        for side, members in sides.items():
+            if side == keep:
+                continue
+            new = self.new_label()
+            count = 0
+            for i in members:
+                for cell in visited[i]:
+                    label[cell] = new
+                count += len(visited[i])
+            self.sizes[new] = count
+            self.sizes[old] -= count
+
+    # cell was taken and now is free
+    def release(self, cell):
+        label = self.label
+        around = {label[nb] for nb in self.neighbours[cell] if label[nb] >= 0}
+        if not around:
+            new = self.new_label()
+            label[cell] = new
+            self.sizes[new] = 1
+            return
+        # join everything into the largest region next to the cell
+        keep = max(around, key=self.sizes.__getitem__)
+        label[cell] = keep
+        self.sizes[keep] += 1
+        for other in around:
+            if other == keep:
+                continue
+            nb = next(x for x in self.neighbours[cell] if label[x] == other)
+            self.sizes[keep] += self.fill(nb, other, keep)
+            del self.sizes[other]
@@ -0,0 +1,68 @@
+# this class draws only what changed since the last frame
+# a normal step changes the new head cell, the tail cell that was left and
+# maybe the food cell, so those cells are marked dirty and only they are
+# redrawn and pushed to the screen with pygame.display.update(rects).
+# the score text is rendered once per score and kept as a surface.
+# the game does the drawing itself through draw_full() and draw_cell(x, y),
+# this class only keeps track of what has to be drawn
+import pygame
+
+class DirtyRenderer:
+    def __init__(self, display, font, text_color, block):
+        self.display = display
+        self.font = font
+        self.text_color = text_color
+        self.block = block
+        self.dirty = [] # points whose cell changed since the last frame
+        self.full_redraw = True
+        self.score_value = None
+        self.score_surface = None
+        self.score_rect = None
+
+    # the cell under point has to be redrawn
+    def mark(self, point):
+        self.dirty.append(point)
+
+    # draw everything on the next frame, after a reset
+    def reset(self):
+        self.dirty.clear()
+        self.full_redraw = True
+
+    # rendered text for the score, only rendered again when the score changes
+    def score_text(self, score):
+        if score != self.score_value:
+            self.score_value = score
+            self.score_surface = self.font.render(f"Score: {score}", True, self.text_color)
+        return self.score_surface
+
+    def render(self, game):
+        # many frames without drawing (every_k mode) can leave more dirty
+        # cells than a full redraw would draw
+        if self.full_redraw or len(self.dirty) > len(game.snake_body):
+            game.draw_full()
+            surface = self.score_text(game.score)
+            self.score_rect = self.display.blit(surface, [10, 10])
+            pygame.display.flip()
+            self.dirty.clear()
+            self.full_redraw = False
+            return
+
+        rects = [game.draw_cell(point.x, point.y) for point in self.dirty if not game.is_outside(point)]
+        self.dirty.clear()
+
+        # the score is drawn over the board, so it has to be drawn again when
+        # it changed or when a cell under it was just redrawn
+        changed = game.score != self.score_value
+        if changed or self.score_rect.collidelist(rects) != -1:
+            surface = self.score_text(game.score)
+            old_rect = self.score_rect
+            new_rect = surface.get_rect(topleft=(10, 10))
+            area = old_rect.union(new_rect)
+            # repaint the cells under the old and new text, then the text on top
+            for y in range(area.top // self.block * self.block, area.bottom, self.block):
+                for x in range(area.left // self.block * self.block, area.right, self.block):
+                    game.draw_cell(x, y)
+            self.score_rect = self.display.blit(surface, [10, 10])
+            rects.append(area)
+
+        pygame.display.update(rects)
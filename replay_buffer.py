@@ -0,0 +1,168 @@
+# this class stores experiences for replay in preallocated numpy arrays
+# one contiguous array per field instead of a deque of python tuples,
+# so appending is O(1), sampling is a single vectorized index and the
+# sampled batch goes to torch without being copied again
+import os
+import numpy as np
+import torch
+from packing import MAX_STATE_BITS, pack_states, unpack_states, pack_codes, unpack_codes
+
+class ReplayBuffer:
+    # path: if given, every array is a memory-mapped .npy file in that folder,
+    # so saving the memory is a flush and loading it back reads nothing up front
+    # packed: keep every state as one uint16 and the action and done flag in
+    # one byte (see packing.py), 9 bytes an experience instead of 101.
+    # only works for states made of at most 16 binary features
+    # resume: the files in path belong to a checkpoint, a file of another
+    # shape is an error instead of being replaced, so a resume with the wrong
+    # settings cannot wipe the saved memory
+    def __init__(self, capacity, state_size, seed=None, path=None, packed=False, resume=False):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.rng = np.random.default_rng(seed)
+        self.path = path
+        self.packed = packed
+        self.resume = resume
+        self.recreated = False # set when a memory-mapped file had to be made anew, see make_array
+
+        if packed:
+            if state_size > MAX_STATE_BITS:
+                raise ValueError(f"packed states hold at most {MAX_STATE_BITS} features, got {state_size}")
+            # other file names than the float arrays so switching never reads one as the other
+            self.states = self.make_array("packed_states", (capacity,), np.uint16)
+            self.codes = self.make_array("codes", (capacity,), np.uint8) # action | done << 2
+            self.rewards = self.make_array("rewards", (capacity,), np.float32)
+            self.next_states = self.make_array("packed_next_states", (capacity,), np.uint16)
+            self.arrays = (self.states, self.codes, self.rewards, self.next_states)
+        else:
+            # states are stored as float32 so torch.from_numpy gives the
+            # trainer exactly the dtype it needs
+            self.states = self.make_array("states", (capacity, state_size), np.float32)
+            self.actions = self.make_array("actions", (capacity,), np.int64) # index of the action taken
+            self.rewards = self.make_array("rewards", (capacity,), np.float32)
+            self.next_states = self.make_array("next_states", (capacity, state_size), np.float32)
+            self.dones = self.make_array("dones", (capacity,), np.bool_)
+            self.arrays = (self.states, self.actions, self.rewards, self.next_states, self.dones)
+
+        self.position = 0 # next slot to write
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    # a zeroed array in ram, or a memory-mapped file when the buffer has a path
+    # an existing file of the right shape is opened as it is so a saved memory can be resumed
+    def make_array(self, name, shape, dtype):
+        if self.path is None:
+            return np.zeros(shape, dtype=dtype)
+        os.makedirs(self.path, exist_ok=True)
+        file = os.path.join(self.path, name + ".npy")
+        if os.path.exists(file):
+            array = np.load(file, mmap_mode="r+")
+            if array.shape == shape and array.dtype == dtype:
+                return array
+            found = (array.shape, array.dtype)
+            del array
+            if self.resume:
+                raise ValueError(
+                    f"{file} holds {found[0]} {found[1]} but this memory needs {shape} {np.dtype(dtype)}. "
+                    "resume with the same memory size, packing and features")
+        self.recreated = True
+        return np.lib.format.open_memmap(file, mode="w+", dtype=dtype, shape=shape)
+
+    # push memory-mapped arrays to disk, nothing to do for a buffer in ram
+    def flush(self):
+        if self.path is None:
+            return
+        for array in self.arrays:
+            array.flush()
+
+    # everything besides the arrays that is needed to pick up where we left off
+    # the layout is kept so a resume with another memory size or state layout is caught
+    def state_dict(self):
+        return {"position": self.position, "size": self.size, "rng": self.rng.bit_generator.state,
+                "capacity": self.capacity, "state_size": self.state_size, "packed": self.packed}
+
+    def load_state_dict(self, state):
+        # checkpoints from before the layout was saved are taken as matching
+        saved = (state.get("capacity", self.capacity), state.get("state_size", self.state_size),
+                 state.get("packed", self.packed))
+        if saved != (self.capacity, self.state_size, self.packed):
+            raise ValueError(
+                f"the checkpoint's replay memory holds {saved[0]} experiences of {saved[1]} features "
+                f"(packed={saved[2]}), this one {self.capacity} of {self.state_size} (packed={self.packed}). "
+                "resume with the same memory size, packing and features")
+        self.rng.bit_generator.state = state["rng"]
+        if self.recreated:
+            # the files were missing or had another shape and are zeros now,
+            # the experiences the checkpoint counted are gone
+            self.position = 0
+            self.size = 0
+            return
+        self.position = state["position"]
+        self.size = state["size"]
+
+    # add one experience, overwriting the oldest once the buffer is full
+    def append(self, state, action, reward, next_state, done):
+        i = self.position
+        if self.packed:
+            self.states[i] = pack_states(state)
+            self.codes[i] = action | (bool(done) << 2)
+            self.next_states[i] = pack_states(next_state)
+        else:
+            self.states[i] = state
+            self.actions[i] = action
+            self.next_states[i] = next_state
+            self.dones[i] = done
+        self.rewards[i] = reward
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return i
+
+    # add a whole chunk of experiences with one vectorized write per field
+    def extend(self, states, actions, rewards, next_states, dones):
+        n = len(actions)
+        idx = (self.position + np.arange(n)) % self.capacity
+        if self.packed:
+            self.states[idx] = pack_states(states)
+            self.codes[idx] = pack_codes(actions, dones)
+            self.next_states[idx] = pack_states(next_states)
+        else:
+            self.states[idx] = states
+            self.actions[idx] = actions
+            self.next_states[idx] = next_states
+            self.dones[idx] = dones
+        self.rewards[idx] = rewards
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return idx
+
+    # pick batch_size random slots, or every slot if there are not that many yet
+    def sample_indices(self, batch_size):
+        if self.size > batch_size:
+            return self.rng.integers(0, self.size, size=batch_size)
+        return np.arange(self.size)
+
+    # gather the given slots into torch tensors
+    # the fancy index makes one copy, from_numpy shares that memory
+    # packed slots are unpacked straight into float32 batches the same way
+    def get_batch(self, idx):
+        if self.packed:
+            actions, dones = unpack_codes(self.codes[idx])
+            return (
+                torch.from_numpy(unpack_states(self.states[idx], self.state_size)),
+                torch.from_numpy(actions),
+                torch.from_numpy(self.rewards[idx]),
+                torch.from_numpy(unpack_states(self.next_states[idx], self.state_size)),
+                torch.from_numpy(dones),
+            )
+        return (
+            torch.from_numpy(self.states[idx]),
+            torch.from_numpy(self.actions[idx]),
+            torch.from_numpy(self.rewards[idx]),
+            torch.from_numpy(self.next_states[idx]),
+            torch.from_numpy(self.dones[idx]),
+        )
+
+    def sample(self, batch_size):
+        return self.get_batch(self.sample_indices(batch_size))
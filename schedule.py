@@ -0,0 +1,41 @@
+# this class decides when the agent trains
+# the default is the original loop: a batch-of-one update on every frame
+# (quick_memory) and one replay batch when a game ends.
+# setting train_every switches to replaying every train_every frames instead,
+# which spreads the learner work evenly over the game and can drop the tiny
+# per-frame updates entirely with short_memory=False
+class TrainingSchedule:
+    # train_every: frames between replay updates, None replays at the end of each game
+    # updates_per_step: replay batches each time training happens
+    # batch_size: experiences per replay batch, None uses the agent's BATCH_SIZE
+    # warmup: no replay until the memory holds this many experiences
+    # short_memory: also train on every single transition as it happens
+    def __init__(self, train_every=None, updates_per_step=1, batch_size=None, warmup=0, short_memory=True):
+        if train_every is not None and train_every < 1:
+            raise ValueError(f"train_every must be at least 1, got {train_every}")
+        self.train_every = train_every
+        self.updates_per_step = updates_per_step
+        self.batch_size = batch_size
+        self.warmup = warmup
+        self.short_memory = short_memory
+
+    def replay(self, agent):
+        # nothing to replay yet, with n_step > 1 the memory starts filling n frames late
+        if len(agent.memory) == 0 or len(agent.memory) < self.warmup:
+            return
+        for _ in range(self.updates_per_step):
+            if self.batch_size is None:
+                agent.experience_replay()
+            else:
+                agent.experience_replay(self.batch_size)
+
+    # call after the transition has been added to the agent's memory
+    def on_step(self, agent, state, action, reward, next_state, done):
+        if self.short_memory:
+            agent.quick_memory(state, action, reward, next_state, done)
+        if self.train_every is not None and agent.n_steps % self.train_every == 0:
+            self.replay(agent)
+
+    def on_game_end(self, agent):
+        if self.train_every is None:
+            self.replay(agent)
@@ -1,33 +1,95 @@
 # this class manages the agent functionality for the snake game ai
 # this agent uses the bellman equation to calculate Q values
+import sys
+import cProfile
+import pstats
 import torch
 import numpy as np
 import random 
-from enum import Enum
-from game_agent import SnakeGameAgent, Point
-from collections import deque # for long term memory storage
+from game_agent import SnakeGameAgent
+from features import POSSIBLE, N_FEATURES, N_REACHABLE_FEATURES, featurize
+from replay_buffer import ReplayBuffer # for long term memory storage
+from prioritized_replay import PrioritizedReplayBuffer
 from trainer import QTrainer
 from model import QNet
-
-class Direction(Enum):
-    RIGHT = 1
-    LEFT = 2
-    UP = 3
-    DOWN = 4
-
-# possible actions and other set values
-POSSIBLE = [[1,0,0], [0,1,0], [0,0,1]] # go straight, take a left, take a right
+from checkpoint import Checkpointer
+from instrumentation import Timers, NullTimers, MetricsLogger
+from schedule import TrainingSchedule
+from recording import EpisodeRecorder
+from nstep import NStepWindow
+from qcache import QCache
+from tabular import TabularQ
+from live import LivePublisher
+
+# set values
 BATCH_SIZE = 1000
+MAX_MEMORY = 100_000
+BACKENDS = ("mlp", "tabular")
 
 class Agent:
-    def __init__(self):
+    # prioritized: replay experiences by td error instead of uniformly
+    # seed: seeds the agent's own random generator for exploration and sampling
+    # memory_path: keep the replay memory in memory-mapped files in this folder
+    # n_step: store n-step returns in the memory instead of single rewards
+    # memory_size: experiences the replay memory holds
+    # packed_memory: bit-pack the memory, see packing.py, about 11x less ram per experience
+    # q_cache_every: pick moves and bootstrap from a table of every state's q values,
+    # rebuilt after that many updates, see qcache.py
+    # backend: "mlp" learns with QNet + QTrainer, "tabular" with a TabularQ that
+    # plays both parts, see tabular.py
+    # reachable: add the reachable-space flags to the state, 14 features instead of 11
+    # resume_memory: memory_path holds a checkpoint's memory, see ReplayBuffer
+    # actor: only play, with no replay memory and no trainer, for an actor
+    # process that sends its transitions to a learner, see distributed.py
+    def __init__(self, prioritized=False, seed=None, memory_path=None, n_step=1,
+                 memory_size=MAX_MEMORY, packed_memory=False, q_cache_every=None, backend="mlp",
+                 reachable=False, resume_memory=False, actor=False):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+        if backend == "tabular" and q_cache_every is not None:
+            raise ValueError("the tabular backend already is a table, it has no q cache")
+        if n_step < 1:
+            raise ValueError(f"n_step must be at least 1, got {n_step}")
+        if actor and q_cache_every is not None:
+            raise ValueError("an actor has no trainer for a q cache to follow")
         self.n_games = 0 # records total number of games
+        self.n_steps = 0 # records total number of frames played
         self.epsilon = 0 # randomness factor
         self.gamma = 0.9 # discount factor meaning importance of future rewards
-        self.memory = deque(maxlen=100_000)
-        self.model = QNet(11, 256, 3)
-        self.learning_rate = 0.001
-        self.trainer = QTrainer(self.gamma, self.learning_rate, self.model)
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed) # for vectorized draws in get_moves
+        self.prioritized = prioritized
+        self.reachable = reachable
+        self.n_features = N_REACHABLE_FEATURES if reachable else N_FEATURES
+        if actor:
+            self.memory = None
+        elif self.prioritized:
+            self.memory = PrioritizedReplayBuffer(memory_size, self.n_features, seed=seed, path=memory_path,
+                                                  packed=packed_memory, resume=resume_memory)
+        else:
+            self.memory = ReplayBuffer(memory_size, self.n_features, seed=seed, path=memory_path,
+                                       packed=packed_memory, resume=resume_memory)
+        self.n_featurizations = 0 # how many times a state was actually computed
+        self.backend = backend
+        if backend == "tabular":
+            self.learning_rate = 0.1
+            self.model = TabularQ(self.n_features, 3, self.gamma, lr=self.learning_rate, n_step=n_step)
+            self.trainer = None if actor else self.model
+        else:
+            self.model = QNet(self.n_features, 256, 3)
+            self.learning_rate = 0.001
+            # no adam state for a model that only gets its weights from the learner
+            self.trainer = None if actor else QTrainer(self.gamma, self.learning_rate, self.model, n_step=n_step)
+        # the frames of the current game that are not n frames old yet
+        self.n_step = n_step
+        self.window = NStepWindow(n_step, self.gamma) if n_step > 1 else None
+        self.q_cache = None
+        if q_cache_every is not None:
+            self.q_cache = QCache(self.model, n_features=self.n_features, refresh_every=q_cache_every)
+            self.trainer.q_cache = self.q_cache
+            self.trainer.update_hooks.append(self.q_cache.mark_stale)
+        # moves come from a lookup in here instead of a QNet forward pass when it is set
+        self.policy = self.model if backend == "tabular" else self.q_cache
 
         # set epsilon decay parameters
         self.epsilon_min = 0.1 # it should have some randomness at least
@@ -41,89 +103,50 @@ class Agent:
         else:
             self.epsilon = self.epsilon_min
 
-    # get current game state
+    # get current game state, computed at most once per frame
     def get_game_state(self, game):
-        # state will look like this -
-        # state = [danger down, danger right, danger left,
-        # danger up, food left, food down, food right, food up, 
-        # manhattan x distance, manhattan y distance
-        head = game.snake_body[0] # current snake head 
-        # checking danger points
-        point_left = Point(head.x-20, head.y)
-        point_right = Point(head.x+20, head.y)
-        point_down = Point(head.x, head.y+20)
-        point_up = Point(head.x, head.y-20)
-
-        # get abs distance of food
-        # dis_x = abs(head.x - game.food.x)
-        # dis_y = abs(head.y - game.food.y)
-
-        # get current direction of snake as a set of booleans
-        direction_r = game.snake_direction == Direction.RIGHT
-        direction_d = game.snake_direction == Direction.DOWN
-        direction_l = game.snake_direction == Direction.LEFT
-        direction_u = game.snake_direction == Direction.UP
-
-        # create state 
-        state = [
-            # check where the danger is
-            # if danger is in the same direction as snake head 
-            (direction_r and game.check_collision(point_right)) or
-            (direction_l and game.check_collision(point_left)) or 
-            (direction_d and game.check_collision(point_down)) or 
-            (direction_u and game.check_collision(point_up)),
-
-            # check if danger is to the right
-            (direction_r and game.check_collision(point_down)) or
-            (direction_d and game.check_collision(point_left)) or
-            (direction_l and game.check_collision(point_up)) or
-            (direction_u and game.check_collision(point_right)),
-
-            # check if danger is to the left 
-            (direction_r and game.check_collision(point_up)) or
-            (direction_d and game.check_collision(point_right)) or
-            (direction_l and game.check_collision(point_down)) or
-            (direction_u and game.check_collision(point_left)),
-
-            # snake direction
-            direction_l,
-            direction_r,
-            direction_d,
-            direction_u,
-
-            # check food placement
-            game.snake_head.x > game.food.x, # left check
-            game.snake_head.x < game.food.x, # right check
-            game.snake_head.y > game.food.y, # down check
-            game.snake_head.y < game.food.y, # up check
-
-        ]
-
-        return np.array(state, dtype = int) # return state for forward feed network
+        if game.observation_version == game.frame_version:
+            return game.observation
+        state = self.featurize(game)
+        self.n_featurizations += 1
+        game.observation = state
+        game.observation_version = game.frame_version
+        return state
+
+    # build the 11 (or 14) features from the game, see features.py
+    def featurize(self, game):
+        return featurize(game, self.reachable)
     
     # get move from our agent
-    def get_move(self, game):
+    # pass state if it was already computed for this frame
+    def get_move(self, game, state=None):
         # exploration vs exploitation
         # get game state first 
         final = [0,0,0]
-        state = self.get_game_state(game)
+        if state is None:
+            state = self.get_game_state(game)
         self.epsilon = 80 - self.n_games
 
         # get random probability value 
-        if random.randint(0,200) < self.epsilon:
+        if self.rng.randint(0,200) < self.epsilon:
             # exploration: random action
-            random_move = random.randint(0,2)
+            random_move = self.rng.randint(0,2)
             final[random_move] = 1
             move = final
         else:
             # exploitation: making best move according to neural network
-            state_tensor = torch.tensor(state, dtype=torch.float)
+            if self.policy is not None:
+                best_action_index = int(self.policy.act(state))
+            else:
+                state_tensor = torch.tensor(state, dtype=torch.float)
 
-            # make prediction and get q values for all possible actions
-            q_values = self.model(state_tensor)
+                # make prediction and get q values for all possible actions
+                # no autograd graph is needed just to pick a move
+                with torch.inference_mode():
+                    q_values = self.model(state_tensor)
 
-            # get best action
-            best_action_index = torch.argmax(q_values).item()
+                # get best action
+                best_action_index = torch.argmax(q_values).item()
 
             # return best move 
             final[best_action_index] = 1
@@ -132,19 +155,50 @@ class Agent:
         # return final move 
         return move
 
+    # get moves for a whole (n, 11) batch of states in one call,
+    # returns n action indices into POSSIBLE
+    # the epsilon rule of get_move is applied to every row on its own
+    def get_moves(self, states):
+        states = np.asarray(states)
+        self.epsilon = 80 - self.n_games
+
+        # exploitation for every row with one forward pass, or one lookup
+        if self.policy is not None:
+            moves = self.policy.act(states)
+        else:
+            with torch.inference_mode():
+                q_values = self.model(torch.as_tensor(states, dtype=torch.float))
+            moves = torch.argmax(q_values, dim=1).numpy()
+
+        # exploration: the same draws as get_move, one per row
+        explore = self.np_rng.integers(0, 201, size=len(states)) < self.epsilon
+        moves[explore] = self.np_rng.integers(0, 3, size=int(explore.sum()))
+        return moves
+
     # add an experience to memory
+    # with n_step > 1 it goes through the window and the memory gets the
+    # n-step transitions it completes instead
     def add_experience(self, state, action, reward, next_state, done):
-        self.memory.append((state,action,reward, next_state, done))
+        if self.window is None:
+            self.memory.append(state, action.index(1), reward, next_state, done)
+            return
+        for transition in self.window.push(state, action.index(1), reward, next_state, done):
+            self.memory.append(*transition)
 
     # the experience replay function
-    def experience_replay(self):
-        if len(self.memory) > BATCH_SIZE:
-            mini_sample = random.sample(self.memory, BATCH_SIZE) # list of tuples
+    def experience_replay(self, batch_size=BATCH_SIZE):
+        # samples batch_size experiences, or the whole memory while it is smaller
+        # with n_step > 1 the memory is still empty for the first frames
+        if len(self.memory) == 0:
+            return
+        idx = self.memory.sample_indices(batch_size)
+        states, actions, rewards, next_states, dones = self.memory.get_batch(idx)
+        if self.prioritized:
+            weights = self.memory.get_weights(idx)
+            td_errors = self.trainer.learn_batch(states, actions, rewards, next_states, dones, weights)
+            self.memory.update_priorities(idx, td_errors)
         else:
-            mini_sample = self.memory
-
-        states, actions, rewards, next_states, dones = zip(*mini_sample)
-        self.trainer.experienced_learning(states, actions, rewards, next_states, dones)
+            self.trainer.learn_batch(states, actions, rewards, next_states, dones)
 
     def quick_memory(self, state, action, reward, next_state, done):
         self.trainer.experienced_learning(state, action, reward, next_state, done)
@@ -161,41 +215,131 @@ class Agent:
     
 
 # define run function
-def run():
+# render_mode is passed to SnakeGameAgent, use "none" to train at full speed
+# checkpoint_dir: save the run there every checkpoint_every games
+# resume: continue from the checkpoint in checkpoint_dir
+# log_every: write a json line of metrics every log_every games
+# timing: add the time spent in every phase of the loop to those lines
+# profile_steps: run that many frames under cProfile, save the stats to profile_output and stop
+# schedule: a TrainingSchedule saying when to train, the default is the original loop
+# record_path: keep every game in an episode log there, see recording.py
+# n_step: learn from n-step returns, see nstep.py
+# memory_size / packed_memory: size and layout of the replay memory, see Agent
+# q_cache_every: use a q value table rebuilt every that many updates, see qcache.py
+# backend: "mlp" or "tabular", see Agent
+# live: name of a shared memory block to publish the game in for a viewer, see live.py
+# live_every: publish one frame in every live_every
+# reachable: add the reachable-space features, see features.py
+def run(render_mode="human", render_every=1, prioritized=False,
+        checkpoint_dir=None, checkpoint_every=100, resume=False,
+        log_every=1, timing=False, profile_steps=None, profile_output="run.prof",
+        schedule=None, record_path=None, n_step=1, memory_size=MAX_MEMORY, packed_memory=False,
+        q_cache_every=None, backend="mlp", live=None, live_every=1,
+        reachable=False):
     # initialize record 
     record = 0
     # initialize game and agent
-    agent = Agent()
-    game = SnakeGameAgent()
-
-    while True:
-        # get current game state
-        current_state = agent.get_game_state(game)
-
-        # decide next move 
-        move = agent.get_move(game)
-
-        # get reward and game_over values 
-        reward, done = game.make_a_step(move)
-
-        # once made the move, get new state 
-        new_state = agent.get_game_state(game)
-
-        # train short term memory
-        agent.quick_memory(current_state, move, reward, new_state, done)
-
-        # add experience to memory
-        agent.add_experience(current_state, move, reward, new_state, done)
-
-        # If game is over, reset and update exploration
-        if done:
-            score = game.score
-            game.reset()
-            agent.n_games += 1
-            agent.experience_replay()
-            if score > record:
-                record = score
-            print(f"Game {agent.n_games} - Score: {score} - Record: {record}")
+    checkpointer = None
+    memory_path = None
+    if checkpoint_dir is not None:
+        checkpointer = Checkpointer(checkpoint_dir)
+        memory_path = checkpointer.replay_path()
+    if resume and (checkpointer is None or not checkpointer.exists()):
+        raise FileNotFoundError(f"no checkpoint to resume from in {checkpoint_dir}")
+    agent = Agent(prioritized=prioritized, memory_path=memory_path, n_step=n_step,
+                  memory_size=memory_size, packed_memory=packed_memory, q_cache_every=q_cache_every,
+                  backend=backend, reachable=reachable, resume_memory=resume)
+    if resume:
+        record = checkpointer.load(agent)
+        print(f"Resumed at game {agent.n_games} - Record: {record}")
+    game = SnakeGameAgent(render_mode=render_mode, render_every=render_every)
+    if schedule is None:
+        schedule = TrainingSchedule()
+    # every recorded game is reset with a seed from the recorder so it can be replayed
+    recorder = None
+    if record_path is not None:
+        recorder = EpisodeRecorder(record_path)
+        game.reset(seed=recorder.begin(game))
+    publisher = None
+    if live is not None:
+        publisher = LivePublisher(game.rows, game.cols, name=live, every=live_every)
+
+    timers = Timers() if timing else NullTimers()
+    game.timers = timers
+    agent.trainer.timers = timers
+    logger = MetricsLogger(timers, agent=agent)
+
+    profiler = None
+    if profile_steps is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # the default loop only ends on ctrl-c or an error, the recorder, the live
+    # block and the profile still have to be closed then
+    try:
+        steps = 0
+        while profile_steps is None or steps < profile_steps:
+            steps += 1
+            if publisher is not None:
+                publisher.publish(game, agent.n_games)
+            t = timers.now()
+            # get current game state
+            current_state = agent.get_game_state(game)
+            t = timers.add("get_game_state", t)
+
+            # decide next move 
+            move = agent.get_move(game, current_state)
+            if recorder is not None:
+                recorder.record(move)
+            t = timers.add("get_move", t)
+
+            # get reward and game_over values 
+            # this includes update_ui and clock_tick when the game is drawn
+            reward, done = game.make_a_step(move)
+            agent.n_steps += 1
+            t = timers.add("make_a_step", t)
+
+            # once made the move, get new state 
+            new_state = agent.get_game_state(game)
+            t = timers.add("get_game_state", t)
+
+            # add experience to memory
+            agent.add_experience(current_state, move, reward, new_state, done)
+            t = timers.add("add_experience", t)
+
+            # train short term memory and / or replay, as the schedule says
+            schedule.on_step(agent, current_state, move, reward, new_state, done)
+            t = timers.add("train_step", t)
+
+            # If game is over, reset and update exploration
+            if done:
+                score = game.score
+                if recorder is not None:
+                    recorder.end(game)
+                    game.reset(seed=recorder.begin(game))
+                else:
+                    game.reset()
+                agent.n_games += 1
+                schedule.on_game_end(agent)
+                timers.add("train_game_end", t)
+                if score > record:
+                    record = score
+                if agent.n_games % log_every == 0:
+                    logger.emit(agent, score, record)
+                if checkpointer is not None and agent.n_games % checkpoint_every == 0:
+                    checkpointer.save(agent, record)
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if publisher is not None:
+            publisher.close()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_output)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
 
 # finally.....
-run()
+# the options live in cli.py, this is the same as python cli.py train
+if __name__ == "__main__":
+    from cli import main
+    main(["train"] + sys.argv[1:])
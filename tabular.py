@@ -0,0 +1,87 @@
+# tabular q-learning, a drop-in for QNet + QTrainer
+# the agent's state is 11 binary features, so a dense (2048, 3) table can
+# hold a q value for every state and action and no network is needed.
+# a batch update is one vectorized scatter: every sampled (state, action)
+# moves towards the mean of its targets in the batch,
+#   Q[s, a] += lr * mean(r + discount * max Q[s'] - Q[s, a])
+# taking the mean instead of the sum keeps a state that shows up hundreds of
+# times in one replay batch from overshooting.
+# it has the methods the agent calls on its trainer (experienced_learning,
+# learn_batch) and on a policy (q_values, act, state_dict), so Agent uses the
+# same object for both. nothing here imports torch at the top, the batches
+# it gets from the replay memory are read with np.asarray
+import numpy as np
+from packing import pack_states
+from instrumentation import NullTimers
+
+class TabularQ:
+    # lr: step size of every update, n_step: see QTrainer
+    def __init__(self, n_features=11, n_actions=3, gamma=0.9, lr=0.1, n_step=1):
+        self.n_features = n_features
+        self.gamma = gamma
+        self.lr = lr
+        self.n_step = n_step
+        self.table = np.zeros((1 << n_features, n_actions), dtype=np.float32)
+        self.optimizer = None # nothing to checkpoint besides the table
+        self.q_cache = None
+        self.n_updates = 0
+        self.update_hooks = []
+        self.timers = NullTimers()
+
+    # a table saved by state_dict(), e.g. for evaluate.py
+    @classmethod
+    def from_state_dict(cls, state):
+        table = np.asarray(state["table"], dtype=np.float32)
+        tabular = cls(int(np.log2(len(table))), table.shape[1])
+        np.copyto(tabular.table, table)
+        return tabular
+
+    # a tensor so checkpoints keep loading with torch.load's weights_only default
+    def state_dict(self):
+        import torch
+        return {"table": torch.from_numpy(self.table.copy())}
+
+    def load_state_dict(self, state):
+        np.copyto(self.table, np.asarray(state["table"]))
+
+    # q values for one (11,) state or a (n, 11) batch of 0 / 1 states
+    def q_values(self, states):
+        return self.table[pack_states(states)]
+
+    def act(self, states):
+        return np.argmax(self.q_values(states), axis=-1)
+
+    # same arguments as QTrainer.experienced_learning, one-hot actions
+    def experienced_learning(self, state, action, reward, next_state, done):
+        state = np.atleast_2d(np.asarray(state))
+        next_state = np.atleast_2d(np.asarray(next_state))
+        action = np.argmax(np.atleast_2d(np.asarray(action)), axis=1)
+        # single frames bootstrap with one gamma, as in QTrainer
+        self.learn_batch(state, action, np.atleast_1d(reward), next_state, np.atleast_1d(done), discount=self.gamma)
+
+    # same arguments as QTrainer.learn_batch, returns the td errors
+    def learn_batch(self, state, action, reward, next_state, done, weights=None, discount=None):
+        start = self.timers.now()
+        if discount is None:
+            discount = self.gamma ** self.n_step
+        s = pack_states(np.asarray(state)).astype(np.intp)
+        a = np.asarray(action).astype(np.intp)
+        reward = np.asarray(reward, dtype=np.float32)
+        done = np.asarray(done, dtype=bool)
+        next_q = self.table[pack_states(np.asarray(next_state))].max(axis=1)
+        target = np.where(done, reward, reward + discount * next_q)
+        td_errors = target - self.table[s, a]
+
+        # mean td error of every (state, action) in the batch, scattered into the table
+        cells = s * self.table.shape[1] + a
+        step = td_errors if weights is None else td_errors * np.asarray(weights)
+        sums = np.bincount(cells, weights=step, minlength=self.table.size)
+        counts = np.bincount(cells, minlength=self.table.size)
+        hit = counts > 0
+        self.table.reshape(-1)[hit] += self.lr * (sums[hit] / counts[hit])
+
+        self.n_updates += 1
+        for hook in self.update_hooks:
+            hook()
+        self.timers.add("learn_batch", start)
+        return td_errors
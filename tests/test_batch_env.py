@@ -0,0 +1,84 @@
+# BatchSnakeEnv(1) against SnakeGameAgent, step for step with the same moves
+# the two place food with different random generators, so the game's food is
+# set to the batch game's food whenever the batch game places some
+# run from the repo root: python -m pytest tests
+import os
+import sys
+import random
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_agent import SnakeGameAgent, Point, BLOCK
+from features import POSSIBLE, featurize
+from batch_env import BatchSnakeEnv
+
+def sync_food(env, game):
+    game.food = Point(int(env.food[0, 0]) * BLOCK, int(env.food[0, 1]) * BLOCK)
+
+# play both with moves from policy(env, rng), returns how often each outcome happened
+def play(h, w, seed, steps, policy):
+    rng = random.Random(seed)
+    env = BatchSnakeEnv(1, h=h, w=w, seed=seed)
+    game = SnakeGameAgent(h=h, w=w, render_mode="none", seed=seed)
+    sync_food(env, game)
+    assert (env.states[0] == featurize(game)).all()
+    seen = {"food": 0, "collision": 0, "timeout": 0, "board_full": 0}
+    for _ in range(steps):
+        action = policy(env, rng)
+        next_states, rewards, dones, scores = env.step([action])
+        reward, done = game.make_a_step(POSSIBLE[action])
+        assert (int(rewards[0]), bool(dones[0]), int(scores[0])) == (reward, done, game.score)
+        if reward == 30:
+            seen["food"] += 1
+        if not done:
+            # the batch game placed food if it ate, the grids have to agree before that matters
+            assert bytes(game.grid) == env.grid[0].tobytes()
+            sync_food(env, game)
+        assert (next_states[0] == featurize(game)).all()
+        if done:
+            seen[game.death] += 1
+            # the batch game reset itself already
+            game.reset()
+            sync_food(env, game)
+            assert (env.states[0] == featurize(game)).all()
+    return seen
+
+# mostly random moves, and some games that only ever turn right: a snake of
+# 3 then runs round a 2 x 2 square until it times out, and one that eats on
+# the way runs into the cell its tail is just leaving
+class RandomOrCircling:
+    def __init__(self):
+        self.circling = False
+
+    def __call__(self, env, rng):
+        if env.nframes[0] == 0:
+            self.circling = rng.random() < 0.3
+        if self.circling:
+            return 2
+        return rng.choice([0, 0, 0, 1, 2])
+
+@pytest.mark.parametrize("h, w, seed", [
+    (480, 640, 0),
+    (480, 640, 1),
+    (80, 80, 2),
+    (120, 160, 3),
+    (200, 240, 4),
+])
+def test_matches_single_game(h, w, seed):
+    seen = play(h, w, seed, 4000, RandomOrCircling())
+    assert seen["food"] > 0 and seen["collision"] > 0 and seen["timeout"] > 0
+
+# on a 2 x n board the snake can follow the ring round the edge forever,
+# so it eats everything and fills the board
+def follow_ring(env, rng):
+    x, y = int(env.head[0, 0]), int(env.head[0, 1])
+    if y == 1:
+        want = 0 if x < env.cols - 1 else 3 # right along the bottom, then up
+    else:
+        want = 2 if x > 0 else 1 # left along the top, then down
+    turn = (want - int(env.direction[0])) % 4
+    return {0: 0, 3: 1, 1: 2}[turn]
+
+def test_board_full():
+    seen = play(40, 80, 5, 2000, follow_ring)
+    assert seen["board_full"] > 0 and seen["collision"] == 0 and seen["timeout"] == 0
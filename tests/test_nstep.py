@@ -0,0 +1,67 @@
+# NStepWindow against n-step returns summed directly from whole episodes
+# run from the repo root: python -m pytest tests
+import os
+import sys
+import random
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nstep import NStepWindow
+
+# the transitions of one episode of rewards, t is the frame index and the
+# state after frame t is t + 1: (t, action t, sum of gamma^k * r_t+k over
+# the next n frames or up to the end, state n frames later, done)
+def brute_force(rewards, n, gamma):
+    T = len(rewards)
+    out = []
+    for t in range(T):
+        end = min(t + n, T)
+        ret = sum(gamma ** (k - t) * rewards[k] for k in range(t, end))
+        out.append((t, t, ret, end, end == T))
+    return out
+
+def play(window, rewards):
+    out = []
+    for t, r in enumerate(rewards):
+        out.extend(window.push(t, t, r, t + 1, t == len(rewards) - 1))
+    return out
+
+def check(got, expected):
+    assert len(got) == len(expected)
+    for g, e in zip(got, expected):
+        assert g[0] == e[0] and g[1] == e[1] and g[3] == e[3] and g[4] == e[4]
+        assert g[2] == pytest.approx(e[2], rel=1e-9, abs=1e-9)
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 16])
+@pytest.mark.parametrize("gamma", [0.0, 0.5, 0.9, 1.0])
+def test_matches_brute_force(n, gamma):
+    rng = random.Random(n * 100 + int(gamma * 10))
+    window = NStepWindow(n, gamma)
+    # one window over many episodes, long ones go through the periodic
+    # recompute, short ones end before the window is ever full
+    for length in [1, 2, n - 1, n, n + 1, 3 * n + 2, 500]:
+        if length < 1:
+            continue
+        rewards = [rng.choice([0, 0, 0, 10, -10]) + rng.random() for _ in range(length)]
+        check(play(window, rewards), brute_force(rewards, n, gamma))
+        assert not window.window and window.ret == 0.0
+
+def test_episode_end_flushes_with_done():
+    window = NStepWindow(4, 0.9)
+    assert window.push(0, 0, 1.0, 1, False) == []
+    assert window.push(1, 1, 2.0, 2, False) == []
+    out = window.push(2, 2, 3.0, 3, True)
+    check(out, brute_force([1.0, 2.0, 3.0], 4, 0.9))
+    assert [t[4] for t in out] == [True, True, True]
+
+def test_clear_forgets_the_unfinished_game():
+    window = NStepWindow(3, 0.9)
+    window.push(0, 0, 5.0, 1, False)
+    window.push(1, 1, 5.0, 2, False)
+    window.clear()
+    rewards = [1.0, -2.0, 3.0, 4.0]
+    check(play(window, rewards), brute_force(rewards, 3, 0.9))
+
+def test_n_below_one():
+    with pytest.raises(ValueError):
+        NStepWindow(0, 0.9)
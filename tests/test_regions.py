@@ -0,0 +1,94 @@
+# RegionTracker against a flood fill of the board after every step of
+# seeded games, with boards small enough for the snake to fill most of them
+# run from the repo root: python -m pytest tests
+import os
+import sys
+import random
+from collections import deque
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_agent import SnakeGameAgent, Point, BLOCK
+from features import POSSIBLE, AHEAD
+from regions import RegionTracker
+
+# size of the free region around every cell, 0 for a taken cell
+def flood_sizes(rows, cols, grid):
+    sizes = [0] * (rows * cols)
+    for start in range(rows * cols):
+        if grid[start] or sizes[start]:
+            continue
+        seen = [start]
+        sizes[start] = -1
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            r, c = divmod(cell, cols)
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                nb = nr * cols + nc
+                if 0 <= nr < rows and 0 <= nc < cols and not grid[nb] and not sizes[nb]:
+                    sizes[nb] = -1
+                    seen.append(nb)
+                    queue.append(nb)
+        for cell in seen:
+            sizes[cell] = len(seen)
+    return sizes
+
+# a move that does not crash right away and, where it can, does not go into
+# a region smaller than the snake, mostly towards the food. the snake gets
+# long and still walls parts of the board off on its way.
+# sizes come from the flood fill, so the moves do not depend on the tracker
+def pick_move(game, rng, sizes):
+    straight, right, left = AHEAD[game.snake_direction]
+    head = game.snake_head
+    safe = []
+    for action, (dx, dy) in zip(range(3), (straight, left, right)):
+        point = Point(head.x + dx * BLOCK, head.y + dy * BLOCK)
+        if not game.check_collision(point):
+            room = sizes[game.cell(point)]
+            distance = abs(point.x - game.food.x) + abs(point.y - game.food.y)
+            safe.append((room < len(game.snake_body), -room if rng.random() < 0.2 else distance, rng.random(), action))
+    if not safe:
+        return POSSIBLE[rng.randrange(3)]
+    return POSSIBLE[min(safe)[3]]
+
+# track_after: frames played before the tracker is started, so it is built
+# from a board that is already in play
+@pytest.mark.parametrize("h, w, seed, track_after", [
+    (120, 160, 0, 0),
+    (120, 160, 1, 25),
+    (200, 200, 2, 0),
+    (200, 200, 3, 60),
+    (480, 640, 4, 0),
+])
+def test_matches_flood_fill(h, w, seed, track_after):
+    rng = random.Random(seed)
+    game = SnakeGameAgent(h=h, w=w, render_mode="none", seed=seed)
+    if track_after == 0:
+        game.track_regions()
+    longest = 0
+    sizes = flood_sizes(game.rows, game.cols, game.grid)
+    for step in range(3000):
+        if step == track_after and game.regions is None:
+            game.track_regions()
+        _, done = game.make_a_step(pick_move(game, rng, sizes))
+        longest = max(longest, len(game.snake_body))
+        if done:
+            game.reset()
+        sizes = flood_sizes(game.rows, game.cols, game.grid)
+        if game.regions is not None:
+            assert [game.regions.size_at(cell) for cell in range(game.rows * game.cols)] == sizes
+    # the snake has to have covered a good part of the board at some point
+    assert longest >= min(40, game.rows * game.cols // 3)
+
+def test_from_grid_splits_walled_off_cells():
+    # a wall down column 2 of a 4 x 5 board and a lone free cell in the corner
+    rows, cols = 4, 5
+    grid = bytearray(rows * cols)
+    for r in range(rows):
+        grid[r * cols + 2] = 1
+    grid[1 * cols + 4] = grid[0 * cols + 3] = 1
+    tracker = RegionTracker.from_grid(rows, cols, grid)
+    assert [tracker.size_at(cell) for cell in range(rows * cols)] == flood_sizes(rows, cols, grid)
+    assert tracker.size_at(0) == 8
+    assert tracker.size_at(4) == 1
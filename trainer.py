@@ -5,23 +5,36 @@ import torch.optim as optim
 import random 
 import torch.nn.functional as F
 import numpy as np
+from instrumentation import NullTimers
 
 
 class QTrainer:
-    def __init__(self, gamma, lr, model):
+    # n_step: the replayed rewards are n-step returns, see nstep.py,
+    # so replay batches bootstrap with gamma ** n_step
+    def __init__(self, gamma, lr, model, n_step=1):
         self.gamma = gamma
+        self.n_step = n_step
         self.lr = lr
         self.model = model
         self.optimizer = optim.Adam(model.parameters(), lr=self.lr)
         self.loss_function = nn.MSELoss()
+        self.n_updates = 0 # optimizer steps taken so far
+        # functions called after every optimizer step, e.g. to resync a NumpyPolicy
+        self.update_hooks = []
+        # swapped for Timers to time every update, the time also counts
+        # towards train_step / train_game_end in the run loop
+        self.timers = NullTimers()
+        # a QCache to look the next states' max q values up in instead of a forward pass
+        self.q_cache = None
 
     
     def experienced_learning(self, state, action, reward, next_state, done):
         # [n , x] n for batch size
-        state = torch.tensor((state), dtype=torch.float)
-        next_state = torch.tensor((next_state), dtype=torch.float)
-        action = torch.tensor((action), dtype=torch.long)
-        reward = torch.tensor((reward), dtype=torch.float)
+        state = torch.tensor(np.array(state), dtype=torch.float)
+        next_state = torch.tensor(np.array(next_state), dtype=torch.float)
+        action = torch.tensor(np.array(action), dtype=torch.long)
+        reward = torch.tensor(np.array(reward), dtype=torch.float)
+        done = torch.tensor(np.array(done), dtype=torch.bool)
 
         # [1,x]
         if len(state.shape) == 1:
@@ -29,25 +42,47 @@ class QTrainer:
             next_state = torch.unsqueeze(next_state, 0)
             action = torch.unsqueeze(action, 0)
             reward = torch.unsqueeze(reward, 0)
-            done = (done, )
+            done = torch.unsqueeze(done, 0)
         
+        # these are single frames, so they bootstrap with one gamma whatever n_step is
+        self.learn_batch(state, torch.argmax(action, dim=1), reward, next_state, done, discount=self.gamma)
+
+    # same update on tensors that are already batched, action holds the
+    # index of the action taken instead of a one-hot vector
+    # weights are optional importance sampling weights, one per sample
+    # discount multiplies the bootstrapped q value, gamma ** n_step by default
+    # returns the td error of every sample for prioritized replay
+    def learn_batch(self, state, action, reward, next_state, done, weights=None, discount=None):
+        start = self.timers.now()
+        if discount is None:
+            discount = self.gamma ** self.n_step
         # Predict Q-value for the current state
         pred = self.model(state)
 
-        # clone the prediction to update Q value 
-        target = pred.clone()
-
-        # loop over done because its a simple tuple 
-        for idx in range(len(done)):
-            Q_new = reward[idx]
-            if not done[idx]:
-                Q_new = reward[idx] + self.gamma * torch.max(self.model(next_state[idx]))
+        # one forward pass for every next state in the batch,
+        # terminal samples just keep their reward
+        if self.q_cache is None:
+            next_q = torch.max(self.model(next_state), dim=1).values
+        else:
+            next_q = torch.from_numpy(self.q_cache.max_q(next_state.numpy()))
+        Q_new = torch.where(done, reward, reward + discount * next_q)
 
-            # update correct q value in target 
-            target[idx][torch.argmax(action[idx]).item()] = Q_new
+        # update the q value of the taken action in a copy of the prediction
+        target = pred.clone().scatter(1, action.unsqueeze(1), Q_new.unsqueeze(1))
 
         # Calculate loss and optimize
         self.optimizer.zero_grad()
-        loss = self.loss_function(target, pred)
+        if weights is None:
+            loss = self.loss_function(target, pred)
+        else:
+            weights = torch.as_tensor(weights, dtype=torch.float)
+            loss = torch.mean(weights.unsqueeze(1) * (target - pred) ** 2)
         loss.backward()
         self.optimizer.step()
+        self.n_updates += 1
+        for hook in self.update_hooks:
+            hook()
+        self.timers.add("learn_batch", start)
+
+        td_errors = Q_new - pred.gather(1, action.unsqueeze(1)).squeeze(1)
+        return td_errors.detach().numpy()